@@ -0,0 +1,457 @@
+# analysis.py
+
+# End-to-end contract analysis pipeline
+# Shared by the Streamlit app and any offline callers
+
+import io
+
+from utils import iter_page_texts, detect_language_with_confidence, tag_clause_languages
+from clause_extraction import split_clauses, iter_clauses
+from risk_engine import clause_scanner, contract_risk_score, contract_risk_score_from_counts, RISK_SCORES, rules_version
+from nlp_pipeline import analyze_clauses, analyze_clause, model_version
+from perf import NULL_TRACER
+from clause_store import ClauseStore
+from contract_classifier import classify_contract
+from revisions import clause_fingerprint, clause_keys, align_clauses, UnchangedMatcher, UNCHANGED
+
+
+DEFAULT_EXPLANATION = "This clause is informational and does not create legal or financial risk."
+DEFAULT_WHY_IT_MATTERS = "General or administrative"
+
+# Streaming mode detects the language from this much leading text
+LANGUAGE_SAMPLE_CHARS = 20000
+
+# Bumped when the shape of analyze_contract results changes, so cached
+# results from older versions are not reused
+RESULT_FORMAT = 4
+
+# Cascade mode: after the rule pass, only clauses with one of these risk
+# levels, or at least this long, get full spaCy analysis; entities of
+# the others are extracted on demand (clause_entities)
+CASCADE_RISKS = ("High", "Medium")
+CASCADE_MIN_CHARS = 2000
+
+# Streaming mode runs NLP over the selected clauses in batches of this
+# many, and holds at most STREAM_WINDOW clause records back meanwhile
+STREAM_NLP_BATCH = 64
+STREAM_WINDOW = 512
+
+
+def open_document(data: bytes, filename: str):
+    """
+    Wraps uploaded bytes in a file object that extract_text understands.
+    """
+    file = io.BytesIO(data)
+    file.name = filename
+    return file
+
+
+def clause_text(result: dict, clause: dict) -> str:
+    """
+    Text of one clause of an analysis result.
+    """
+    if "text" in clause:
+        return clause["text"]
+    return result["text"][clause["start"]:clause["end"]]
+
+
+def needs_full_nlp(text: str, scan: dict) -> bool:
+    """
+    Default cascade criteria: flagged clauses and very long ones.
+    """
+    return scan["risk"] in CASCADE_RISKS or len(text) >= CASCADE_MIN_CHARS
+
+
+def clause_entities(result: dict, clause: dict, memo: dict = None) -> list:
+    """
+    Named entities of one clause as (text, label) pairs. Clauses the
+    cascade skipped are analyzed now and remembered in memo (by clause
+    id), never in the result: cached results are shared between sessions.
+    """
+    entities = result.get("entities", {})
+    if clause["id"] in entities:
+        return entities[clause["id"]]
+    memo = {} if memo is None else memo
+    if clause["id"] not in memo:
+        memo[clause["id"]] = analyze_clause(clause_text(result, clause))["entities"]
+    return memo[clause["id"]]
+
+
+def _track_pages(chunks, stats: dict, sample: list = None, sample_limit=0, tracer=NULL_TRACER):
+    # Passes chunks through, counting pages and characters, keeping up
+    # to sample_limit leading characters in sample and checking the
+    # tracer's memory budget once per page
+    sampled = 0
+    for chunk in chunks:
+        tracer.check_memory()
+        stats["pages"] += 1
+        stats["characters"] += len(chunk)
+        if sampled < sample_limit:
+            sample.append(chunk[:sample_limit - sampled])
+            sampled += len(sample[-1])
+        yield chunk
+
+
+def _describe_sample(sample: list, tracer):
+    # Language and contract type of a streamed document, from its leading text
+    with tracer.span("language_detection", characters=sum(len(chunk) for chunk in sample)):
+        language, confidence = detect_language_with_confidence(" ".join(sample))
+
+    with tracer.span("contract_classification"):
+        contract_type = classify_contract(" ".join(sample))
+
+    return language, confidence, contract_type
+
+
+class _ClauseStream:
+    # Streaming mode: scores each clause as it is split, runs NLP over the
+    # selected ones in small batches and keeps only the clause records
+
+    def __init__(self, tracer, clause_languages, previous, full_nlp, nlp_criteria, keep_text, fingerprinting):
+        self.tracer = tracer
+        self.clause_languages = clause_languages
+        self.full_nlp = full_nlp
+        self.nlp_criteria = nlp_criteria
+        self.keep_text = keep_text
+        self.language = None
+
+        self.previous_clauses = previous["clauses"] if previous is not None else None
+        self.previous_entities = previous.get("entities", {}) if previous is not None else {}
+        self.unchanged = UnchangedMatcher(clause_keys(previous)) if previous is not None else None
+        self.fingerprints = [] if fingerprinting else None
+        self.scan = clause_scanner()
+
+        self.clause_results = ClauseStore()
+        self.entities = {}
+        self.reused = 0
+        self.analyzed = 0
+        self._window = []
+        self._selected = []
+
+    def start(self, language: str, clauses):
+        # Scoring starts once the document language is known
+        self.language = language
+        for clause in clauses:
+            self.add(clause)
+
+    def add(self, clause):
+        text = clause.text
+        record = {
+            "id": len(self.clause_results) + len(self._window) + 1,
+            "start": clause.offset,
+            "end": clause.offset + len(clause),
+            "heading": clause.kind,
+            "number": clause.number
+        }
+
+        old = None
+        if self.fingerprints is not None or self.unchanged is not None:
+            fingerprint = clause_fingerprint(text)
+            if self.fingerprints is not None:
+                self.fingerprints.append(fingerprint)
+            if self.unchanged is not None:
+                old_idx = self.unchanged.match(fingerprint, clause.kind, clause.number)
+                if old_idx is not None:
+                    old = self.previous_clauses[old_idx]
+                    # Language tags only carry over between runs with the same setting
+                    if ("language" in old) != self.clause_languages:
+                        old = None
+
+        if old is not None:
+            self.reused += 1
+            record.update((field, value) for field, value in old.items() if field not in record and field != "text")
+            if old["id"] in self.previous_entities:
+                self.entities[record["id"]] = self.previous_entities[old["id"]]
+            elif self.full_nlp:
+                self._selected.append((record, text, False))
+        else:
+            tag = tag_clause_languages([text], default=self.language)[0] if self.clause_languages else None
+            scan = self.scan(text, tag)
+            record.update({
+                "risk": scan["risk"],
+                "types": scan["types"] if scan["types"] else ["General"],
+                "explanation": DEFAULT_EXPLANATION,
+                "why_it_matters": DEFAULT_WHY_IT_MATTERS
+            })
+            if tag:
+                record["language"] = tag
+            if self.full_nlp or self.nlp_criteria(text, scan):
+                self._selected.append((record, text, True))
+
+        # Without a shared source text, streamed clauses keep their own copy
+        if self.keep_text:
+            record["text"] = text
+
+        self._window.append(record)
+        if len(self._selected) >= STREAM_NLP_BATCH or len(self._window) >= STREAM_WINDOW:
+            self.flush()
+
+    def flush(self):
+        selected = self._selected
+        for (record, _, fresh), nlp_data in zip(selected, analyze_clauses(text for _, text, _ in selected)):
+            self.entities[record["id"]] = nlp_data["entities"]
+            if fresh:
+                record["explanation"] = nlp_data.get("explanation", DEFAULT_EXPLANATION)
+                record["why_it_matters"] = nlp_data.get("why_it_matters", DEFAULT_WHY_IT_MATTERS)
+        self.analyzed += len(selected)
+
+        for record in self._window:
+            self.clause_results.append(record)
+        self._window = []
+        self._selected = []
+        self.tracer.check_memory()
+
+
+def analyze_contract(file, streaming=False, pdf_workers=None, tracer=None, clause_languages=False, previous=None,
+                     full_nlp=False, nlp_criteria=needs_full_nlp, templates=None, document_hash=None,
+                     keep_text=True) -> dict:
+    """
+    Runs extraction, language detection, contract type classification,
+    clause splitting, rule scoring and NLP over one uploaded contract.
+    Returns a plain dict that can be cached or serialized. Clauses are a
+    ClauseStore of offsets into result["text"]; use clause_text() to read
+    them.
+
+    With streaming=True pages are split into clauses as they are read and
+    each clause is scored (and, in batches, run through NLP) as soon as it
+    is split; the full text is never built and the language comes from
+    the leading text. Only the compact clause records are kept, plus each
+    clause's own text unless keep_text=False (then clause_text() cannot
+    read them). Near-duplicate templates are recorded but not looked up,
+    since the match needs every clause before scoring starts.
+    pdf_workers > 1 extracts long PDFs in a process pool.
+    tracer (perf.Tracer) records a span per stage; the spans are also
+    returned under "timings". A tracer with a memory budget aborts the
+    run with perf.MemoryBudgetExceeded once the budget is passed.
+    clause_languages=True tags each clause "en"/"hi" and scores it with
+    that language's rules, for bilingual contracts.
+    previous (an earlier result for another version of the contract)
+    makes clauses with unchanged content reuse their previous analysis;
+    only changed and inserted clauses are scored and run through NLP.
+
+    By default NLP runs as a cascade: only clauses for which
+    nlp_criteria(text, scan) is true get full spaCy analysis, and
+    result["entities"] holds their entities by clause id. full_nlp=True
+    analyzes every clause (for audits).
+
+    templates (near_duplicates.NearDuplicateIndex) looks the contract up
+    among earlier ones by clause-set similarity; a near-duplicate reuses
+    the matched template's analysis of identical clauses like previous
+    does, and result["template"] names the template. The contract is
+    then recorded in the index under document_hash.
+    """
+    tracer = tracer or NULL_TRACER
+    stats = {"pages": 0, "characters": 0}
+
+    with tracer.span("analysis") as root:
+        if streaming:
+            full_text = None
+            sample = []
+            stream = _ClauseStream(
+                tracer, clause_languages, previous, full_nlp, nlp_criteria, keep_text, templates is not None
+            )
+            with tracer.span("streamed_analysis") as s:
+                clauses = iter_clauses(_track_pages(
+                    iter_page_texts(file, pdf_workers), stats, sample, LANGUAGE_SAMPLE_CHARS, tracer
+                ))
+
+                # Clauses wait until the language sample is complete
+                waiting = []
+                for clause in clauses:
+                    if waiting is None:
+                        stream.add(clause)
+                        continue
+                    waiting.append(clause)
+                    if stats["characters"] >= LANGUAGE_SAMPLE_CHARS:
+                        language, confidence, contract_type = _describe_sample(sample, tracer)
+                        stream.start(language, waiting)
+                        waiting = None
+                if waiting is not None:
+                    language, confidence, contract_type = _describe_sample(sample, tracer)
+                    stream.start(language, waiting)
+                stream.flush()
+
+                clause_results = stream.clause_results
+                entities = stream.entities
+                s.set(
+                    clauses=len(clause_results), reused=stream.reused, analyzed=stream.analyzed,
+                    deferred=len(clause_results) - len(entities), **stats
+                )
+
+            risk_levels = clause_results.risk_levels()
+            overall_risk = contract_risk_score(risk_levels)
+            fingerprints = stream.fingerprints
+            template = None
+            similarity = 0.0
+            reused = {}
+            if templates is not None:
+                signature = templates.signature(fingerprints)
+                config = "|".join([rules_version(), model_version(), str(RESULT_FORMAT)])
+        else:
+            with tracer.span("extraction") as s:
+                full_text = " ".join(_track_pages(
+                    iter_page_texts(file, pdf_workers), stats, tracer=tracer
+                ))
+
+                # Same normalization as the splitter, so clause offsets index full_text
+                full_text = full_text.replace("\r", "\n")
+                s.set(**stats)
+
+            with tracer.span("language_detection", characters=len(full_text)):
+                language, confidence = detect_language_with_confidence(full_text)
+
+            with tracer.span("contract_classification"):
+                contract_type = classify_contract(full_text)
+
+            with tracer.span("clause_splitting") as s:
+                clauses = split_clauses(full_text)
+                s.set(clauses=len(clauses))
+
+            fingerprints = None
+            if previous is not None or templates is not None:
+                fingerprints = [clause_fingerprint(clause.text) for clause in clauses]
+
+            template = None
+            if templates is not None:
+                with tracer.span("template_matching", clauses=len(clauses)) as s:
+                    signature = templates.signature(fingerprints)
+                    config = "|".join([rules_version(), model_version(), str(RESULT_FORMAT)])
+                    similarity = 0.0
+                    if previous is None:
+                        template, similarity = templates.find(signature, config)
+                        if template is not None:
+                            previous = template["payload"]
+                    s.set(similarity=round(similarity, 3))
+
+            # Clause index -> (previous index, previous clause dict) to reuse
+            reused = {}
+            if previous is not None:
+                with tracer.span("revision_alignment") as s:
+                    matches, _ = align_clauses(
+                        clause_keys(previous),
+                        [(fingerprint, clause.kind, clause.number) for fingerprint, clause in zip(fingerprints, clauses)]
+                    )
+                    for idx, (status, old_idx) in enumerate(matches):
+                        old = previous["clauses"][old_idx] if old_idx is not None else None
+                        # Language tags only carry over between runs with the same setting
+                        if status == UNCHANGED and ("language" in old) == clause_languages:
+                            reused[idx] = (old_idx, old)
+                    s.set(reused=len(reused), reanalyzed=len(clauses) - len(reused))
+
+            pending = [clause for idx, clause in enumerate(clauses) if idx not in reused]
+
+            if clause_languages:
+                with tracer.span("clause_language_tagging", clauses=len(pending)):
+                    tags = tag_clause_languages((clause.text for clause in pending), default=language)
+            else:
+                tags = [None] * len(pending)
+
+            with tracer.span("rule_scoring", clauses=len(pending)):
+                scan = clause_scanner()
+                scans = [scan(clause.text, tag) for clause, tag in zip(pending, tags)]
+
+            with tracer.span("nlp", clauses=len(clauses)) as s:
+                previous_entities = previous.get("entities", {}) if previous is not None else {}
+                entities = {}
+                selected = []
+                scan_of = dict(zip((idx for idx in range(len(clauses)) if idx not in reused), scans))
+                for idx, clause in enumerate(clauses):
+                    if idx in reused:
+                        old_id = reused[idx][1]["id"]
+                        if old_id in previous_entities:
+                            entities[idx + 1] = previous_entities[old_id]
+                        elif full_nlp:
+                            selected.append(idx)
+                    elif full_nlp or nlp_criteria(clause.text, scan_of[idx]):
+                        selected.append(idx)
+
+                nlp_results = {}
+                for idx, nlp_data in zip(selected, analyze_clauses(clauses[idx].text for idx in selected)):
+                    nlp_results[idx] = nlp_data
+                    tracer.check_memory()
+                for idx, nlp_data in nlp_results.items():
+                    entities[idx + 1] = nlp_data["entities"]
+                s.set(analyzed=len(selected), deferred=len(clauses) - len(entities))
+
+            fresh = iter(zip(tags, scans))
+            clause_results = ClauseStore()
+            for idx, clause in enumerate(clauses):
+                # Position fields always come from this version
+                record = {
+                    "id": idx + 1,
+                    "start": clause.offset,
+                    "end": clause.offset + len(clause),
+                    "heading": clause.kind,
+                    "number": clause.number
+                }
+
+                if idx in reused:
+                    record.update(
+                        (field, value) for field, value in reused[idx][1].items()
+                        if field not in record and field != "text"
+                    )
+                else:
+                    tag, scan = next(fresh)
+                    nlp_data = nlp_results.get(idx, {})
+
+                    record.update({
+                        "risk": scan["risk"],
+                        "types": scan["types"] if scan["types"] else ["General"],
+                        "explanation": nlp_data.get("explanation", DEFAULT_EXPLANATION),
+                        "why_it_matters": nlp_data.get("why_it_matters", DEFAULT_WHY_IT_MATTERS)
+                    })
+
+                    if tag:
+                        record["language"] = tag
+
+                clause_results.append(record)
+                tracer.check_memory()
+
+            risk_levels = clause_results.risk_levels()
+
+            if previous is None:
+                overall_risk = contract_risk_score(risk_levels)
+            else:
+                # Start from the previous per-level counts and apply only the
+                # clauses that were dropped or re-analyzed
+                kept = {old_idx for old_idx, _ in reused.values()}
+                counts = {level: previous["risk_levels"].count(level) for level in RISK_SCORES}
+                for old_idx, level in enumerate(previous["risk_levels"]):
+                    if old_idx not in kept:
+                        counts[level] -= 1
+                for scan in scans:
+                    counts[scan["risk"]] += 1
+                overall_risk = contract_risk_score_from_counts(counts)
+
+        root.set(clauses=len(clause_results), **stats)
+
+    result = {
+        "text": full_text,
+        "language": language,
+        "language_confidence": confidence,
+        "contract_type": contract_type,
+        "clauses": clause_results,
+        "risk_levels": risk_levels,
+        "overall_risk": overall_risk,
+        "entities": entities,
+        "nlp_mode": "full" if full_nlp else "cascade",
+        "template": None,
+        "timings": tracer.to_list()
+    }
+
+    if templates is not None:
+        if template is not None:
+            result["template"] = {
+                "name": template["name"],
+                "document_hash": template["document_hash"],
+                "similarity": round(similarity, 3),
+                "reused": len(reused)
+            }
+        if document_hash:
+            templates.add(
+                document_hash, file.name, signature, result, fingerprints,
+                template_id=template["id"] if template is not None else None,
+                config=config
+            )
+
+    return result
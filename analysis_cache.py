@@ -0,0 +1,185 @@
+# analysis_cache.py
+
+# Content-addressed cache for full contract analysis results
+# Memory LRU tier in front of an optional size-bounded disk tier
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from risk_engine import rules_version
+from nlp_pipeline import model_version
+from analysis import RESULT_FORMAT
+
+
+def document_hash(data: bytes) -> str:
+    """
+    SHA-256 of the uploaded bytes.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_key(doc_hash: str, filename: str, *options) -> str:
+    """
+    Combines the document hash with everything else that changes the
+    analysis: the file type, the rule set, the NLP model, the result
+    layout and any caller options (e.g. the NLP mode).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    material = "|".join([doc_hash, extension, rules_version(), model_version(), str(RESULT_FORMAT), *map(str, options)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of analysis results keyed by cache_key.
+    The disk tier is used only when disk_dir is set; its oldest entries
+    are evicted once the directory exceeds disk_max_bytes.
+    """
+
+    def __init__(self, max_entries=32, disk_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["disk_hits"] += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, key: str, compute):
+        """
+        Returns (value, cached). compute() runs only on a miss.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        value = compute()
+        self.put(key, value)
+        return value, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 3) if lookups else 0.0
+        if self.disk_dir:
+            stats["disk_bytes"] = sum(size for _, size, _ in self._disk_entries())
+        return stats
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        # Touch the file so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        self._evict_disk()
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict_disk(self):
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+
+        # Oldest first
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> AnalysisCache:
+    """
+    Process-wide cache, configured from the environment:
+    ANALYSIS_CACHE_SIZE (memory entries), ANALYSIS_CACHE_DIR (enables the
+    disk tier) and ANALYSIS_CACHE_MAX_MB (disk tier size limit).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(
+                    max_entries=int(os.environ.get("ANALYSIS_CACHE_SIZE", "32")),
+                    disk_dir=os.environ.get("ANALYSIS_CACHE_DIR") or None,
+                    disk_max_bytes=int(os.environ.get("ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024
+                )
+    return _cache
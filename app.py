@@ -1,11 +1,45 @@
+import bisect
+import os
+
+import perf
 import streamlit as st
 
-from utils import extract_text, detect_language
-from clause_extraction import extract_clauses
-from risk_engine import detect_clause_types, assess_risk_level, contract_risk_score
-from nlp_pipeline import analyze_clause
-from pdf_export import generate_pdf
-from audit_logger import save_audit_log
+from analysis import analyze_contract, open_document, clause_text, clause_entities
+from analysis_cache import get_cache, document_hash, cache_key
+from nlp_pipeline import warm_up_async
+from audit_logger import save_audit_log, AUDIT_DIR
+from revisions import compare_results
+from clause_index import get_index
+from near_duplicates import get_duplicate_index
+from risk_engine import RISK_PATTERNS
+
+perf.mark_startup("imports")
+
+# Uploads above this size are analyzed clause by clause as pages are read
+STREAMING_MIN_BYTES = 10 * 1024 * 1024
+
+# Process pool size for long PDFs (short ones are always read serially)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+
+# Per-stage timing spans (PERF_TRACING=0 turns them off)
+PERF_TRACING = os.environ.get("PERF_TRACING", "1") != "0"
+
+# Opt-in per-stage memory accounting, and a budget that aborts the
+# analysis instead of letting the process run out of memory
+MEMORY_PROFILING = os.environ.get("MEMORY_PROFILING", "0") == "1"
+MEMORY_BUDGET_MB = float(os.environ["MEMORY_BUDGET_MB"]) if os.environ.get("MEMORY_BUDGET_MB") else None
+
+# NLP_MODE=full runs spaCy on every clause instead of the rule-first cascade
+FULL_NLP = os.environ.get("NLP_MODE", "cascade") == "full"
+
+# Clauses rendered per page of the clause-by-clause section
+CLAUSES_PER_PAGE = int(os.environ.get("CLAUSES_PER_PAGE", 25))
+
+# Reuse the analysis of near-identical earlier contracts (TEMPLATE_MATCHING=0 turns it off)
+TEMPLATE_MATCHING = os.environ.get("TEMPLATE_MATCHING", "1") != "0"
+
+# Files per session whose last two versions are kept for comparison
+SESSION_VERSION_FILES = 8
 
 
 st.set_page_config(
@@ -127,6 +161,13 @@ uploaded_file = st.file_uploader(
     "Upload your contract (PDF, DOCX, TXT)",
     type=["pdf", "docx", "txt"]
 )
+perf.mark_startup("upload_widget")
+
+# Load the spaCy model in the background while the user picks a file
+warm_up_async()
+
+with st.sidebar.expander("Startup timings (ms)"):
+    st.json(perf.startup_report())
 
 st.markdown(
     "<small>Files are processed locally. No data is shared.</small>",
@@ -139,48 +180,145 @@ st.warning(
 )
 
 if uploaded_file:
+    tracer = perf.Tracer(enabled=PERF_TRACING, memory=MEMORY_PROFILING, memory_budget_mb=MEMORY_BUDGET_MB)
+    compare_versions = st.sidebar.checkbox("Compare with previous version", value=True)
+    full_nlp = st.sidebar.checkbox(
+        "Full NLP analysis (audit)",
+        value=FULL_NLP,
+        help="Run spaCy on every clause instead of only the flagged ones"
+    )
+
     with st.spinner("Reading and analyzing contract..."):
-        full_text = extract_text(uploaded_file)
-        language = detect_language(full_text)
-        clauses = extract_clauses(full_text)
-
-        clause_results = []
-        risk_levels = []
-
-        for idx, clause in enumerate(clauses, start=1):
-            clause_types = detect_clause_types(clause)
-            risk_level = assess_risk_level(clause)
-            risk_levels.append(risk_level)
-
-            nlp_data = analyze_clause(clause) or {}
-
-            clause_results.append({
-                "id": idx,
-                "text": clause,
-                "risk": risk_level,
-                "types": clause_types if clause_types else ["General"],
-                "explanation": nlp_data.get(
-                    "explanation",
-                    "This clause is informational and does not create legal or financial risk."
-                ),
-                "why_it_matters": nlp_data.get(
-                    "why_it_matters",
-                    "General or administrative"
+        data = uploaded_file.getvalue()
+        doc_hash = document_hash(data)
+        nlp_mode = "full" if full_nlp else "cascade"
+        key = cache_key(doc_hash, uploaded_file.name, nlp_mode)
+
+        # A new version of a file (same name and NLP mode, other content)
+        # turns its last analysis into the previous version, so a redline
+        # only re-analyzes the clauses it touched. Other files never count
+        # as a previous version.
+        versions = st.session_state.setdefault("versions", {})
+        version_key = (uploaded_file.name, nlp_mode)
+        last, previous = versions.get(version_key, (None, None))
+        if last and last[0] != doc_hash:
+            previous = last
+        compare_with = previous if compare_versions else None
+
+        # Reruns and re-uploads of the same contract reuse the stored analysis
+        try:
+            result, cached = get_cache().get_or_compute(
+                key,
+                lambda: analyze_contract(
+                    open_document(data, uploaded_file.name),
+                    streaming=len(data) >= STREAMING_MIN_BYTES,
+                    pdf_workers=PDF_WORKERS,
+                    tracer=tracer,
+                    clause_languages=True,
+                    previous=compare_with[1] if compare_with else None,
+                    full_nlp=full_nlp,
+                    templates=get_duplicate_index() if TEMPLATE_MATCHING else None,
+                    document_hash=doc_hash
                 )
+            )
+        except perf.MemoryBudgetExceeded as e:
+            audit_id = save_audit_log({
+                "event": "memory_budget_exceeded",
+                "document_hash": doc_hash,
+                "error": str(e),
+                "stage": e.stage,
+                "top_sites": e.sites,
+                "performance": tracer.to_list()
             })
-
-        overall_risk = contract_risk_score(risk_levels)
+            st.error(
+                f"{e}. The analysis was stopped to protect the service; "
+                f"details are in audit record {audit_id}."
+            )
+            st.stop()
+        versions.pop(version_key, None)
+        versions[version_key] = ((doc_hash, result), previous)
+        while len(versions) > SESSION_VERSION_FILES:
+            del versions[next(iter(versions))]
+        previous = compare_with
+
+        # Entities extracted on demand belong to this session, not the shared cached result
+        if st.session_state.get("deferred_entities", (None,))[0] != key:
+            st.session_state["deferred_entities"] = (key, {})
+        deferred_entities = st.session_state["deferred_entities"][1]
+
+        language = result["language"]
+        clause_results = result["clauses"]
+        overall_risk = result["overall_risk"]
+
+        # Render the PDF report in the background while the page is drawn
+        pdf_reports = st.session_state.setdefault("pdf_reports", {})
+        if key not in pdf_reports:
+            # reportlab is only needed from here on, so import it on demand
+            from pdf_export import prerender_pdf
+
+            pdf_reports[key] = prerender_pdf(
+                overall_risk=overall_risk,
+                total_clauses=len(clause_results),
+                contract_type=result["contract_type"]["type"],
+                risk_summary=clause_results.risk_summary()
+            )
 
         st.subheader("Contract Classification")
-        st.info("Detected Contract Type: Employment Contract")
-        st.info(f"Detected language: {language}")
+        contract_type = result["contract_type"]
+        st.info(f"Detected Contract Type: {contract_type['type']} (confidence {contract_type['confidence']:.0%})")
+        st.info(f"Detected language: {language} (confidence {result['language_confidence']:.0%})")
+        template = result.get("template")
+        if template:
+            st.info(
+                f"Matched template: {template['name']} (similarity {template['similarity']:.0%}), "
+                f"reused {template['reused']} of {len(clause_results)} clause analyses"
+            )
+        elif result["text"] is None and TEMPLATE_MATCHING:
+            st.caption("Large upload analyzed page by page; it was not compared with earlier contracts.")
 
         st.subheader("Contract Overview")
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Total Clauses", len(clause_results))
-        col2.metric("High Risk", risk_levels.count("High"))
-        col3.metric("Medium Risk", risk_levels.count("Medium"))
-        col4.metric("Low Risk", risk_levels.count("Low"))
+        col2.metric("High Risk", clause_results.count("High"))
+        col3.metric("Medium Risk", clause_results.count("Medium"))
+        col4.metric("Low Risk", clause_results.count("Low"))
+
+        if previous:
+            delta = compare_results(previous[1], result)
+
+            st.subheader("Changes Since Previous Version")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric(
+                "Overall Risk",
+                overall_risk,
+                delta=f"was {delta['previous_overall_risk']}",
+                delta_color="off"
+            )
+            for col, level in zip((col2, col3, col4), ("High", "Medium", "Low")):
+                col.metric(
+                    f"{level} Risk",
+                    clause_results.count(level),
+                    delta=delta["risk_deltas"][level],
+                    delta_color="inverse" if level != "Low" else "normal"
+                )
+
+            counts = delta["counts"]
+            st.caption(
+                f"{counts['unchanged']} unchanged, {counts['changed']} changed, "
+                f"{counts['inserted']} inserted, {counts['removed']} removed clauses."
+            )
+            if delta["changes"]:
+                st.table([
+                    {
+                        "Clause": change["id"] or "-",
+                        "Previous Clause": change["previous_id"] or "-",
+                        "Status": change["status"].capitalize(),
+                        "Previous Risk": change["previous_risk"] or "-",
+                        "Risk": change["risk"] or "-",
+                        "Types": ", ".join(change["types"])
+                    }
+                    for change in delta["changes"]
+                ])
 
         st.markdown("""
         <div class="nav-bar">
@@ -206,7 +344,7 @@ if uploaded_file:
             """, unsafe_allow_html=True)
 
         with st.expander("Where can I lose money in this contract?"):
-            high_risk = any(c["risk"] == "High" for c in clause_results)
+            high_risk = clause_results.count("High") > 0
             st.markdown(f"""
             <div class="qa-card">
                 <div class="qa-question">Financial Exposure</div>
@@ -219,7 +357,7 @@ if uploaded_file:
             """, unsafe_allow_html=True)
 
         with st.expander("Can the other party terminate this contract easily?"):
-            unilateral = any("Unilateral Termination" in c["types"] for c in clause_results)
+            unilateral = clause_results.any_type("Unilateral Termination")
             st.markdown(f"""
             <div class="qa-card">
                 <div class="qa-question">Termination Rights</div>
@@ -245,14 +383,56 @@ if uploaded_file:
         st.markdown('<div id="clause-analysis" class="section-anchor"></div>', unsafe_allow_html=True)
         st.subheader("Clause-by-Clause Analysis")
 
-        for clause in clause_results:
+        # Only one page of clauses is sent to the browser; paging and
+        # filtering rerun against the cached analysis
+        filter_col1, filter_col2, filter_col3 = st.columns([2, 3, 1])
+        risk_filter = filter_col1.multiselect("Risk level", ["High", "Medium", "Low"])
+        type_filter = filter_col2.multiselect("Clause type (any of)", list(clause_results.type_counts()))
+        jump_to = filter_col3.number_input("Jump to clause", min_value=0, max_value=len(clause_results), step=1)
+        show_entities = st.checkbox("Show named entities")
+
+        positions = clause_results.filter(risk=risk_filter or None, clause_type=type_filter or None)
+        page_count = max(1, -(-len(positions) // CLAUSES_PER_PAGE))
+
+        # A new document or filter starts again from the first page
+        view = (key, tuple(risk_filter), tuple(type_filter))
+        if st.session_state.get("clause_view") != view:
+            st.session_state["clause_view"] = view
+            st.session_state["clause_page"] = 1
+
+        if jump_to and st.session_state.get("clause_jump") != (view, jump_to):
+            st.session_state["clause_jump"] = (view, jump_to)
+            position = clause_results.position(jump_to)
+            index = bisect.bisect_left(positions, position)
+            if index < len(positions) and positions[index] == position:
+                st.session_state["clause_page"] = index // CLAUSES_PER_PAGE + 1
+            else:
+                st.warning(f"Clause {jump_to} is hidden by the current filters.")
+
+        st.session_state["clause_page"] = min(max(st.session_state.get("clause_page", 1), 1), page_count)
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="clause_page")
+
+        first = (page - 1) * CLAUSES_PER_PAGE
+        visible = positions[first:first + CLAUSES_PER_PAGE]
+        if visible:
+            st.caption(
+                f"Showing clauses {first + 1}-{first + len(visible)} of {len(positions)}"
+                + (f" (filtered from {len(clause_results)})" if len(positions) != len(clause_results) else "")
+                + f", page {page} of {page_count}"
+            )
+        else:
+            st.caption("No clauses match the selected filters.")
+
+        for position in visible:
+            clause = clause_results[position]
             risk_color = "green" if clause["risk"] == "Low" else "orange" if clause["risk"] == "Medium" else "red"
+            outline = "outline: 2px solid #2563eb;" if clause["id"] == jump_to else ""
             st.markdown(f"""
             <div style="border-left: 6px solid {risk_color};
                         padding: 16px;
                         border-radius: 10px;
                         background-color: #0e1117;
-                        margin-bottom: 20px;">
+                        margin-bottom: 20px;{outline}">
                 <strong>Clause {clause['id']}</strong>
                 <span style="background-color:{risk_color};
                              color:white;
@@ -265,15 +445,23 @@ if uploaded_file:
             </div>
             """, unsafe_allow_html=True)
 
-            st.markdown(clause["text"])
+            st.markdown(clause_text(result, clause))
             st.info(clause["explanation"])
             st.markdown(f"**Why it matters:** {clause['why_it_matters']}")
 
+            # Entities of clauses the cascade skipped are extracted here, page by page
+            if show_entities:
+                entities = clause_entities(result, clause, deferred_entities)
+                st.caption(
+                    "Entities: " + ", ".join(f"{text} ({label})" for text, label in entities)
+                    if entities else "No named entities found."
+                )
+
         st.markdown('<div id="final-risk" class="section-anchor"></div>', unsafe_allow_html=True)
         st.subheader("Overall Contract Risk Assessment")
 
-        high_count = risk_levels.count("High")
-        medium_count = risk_levels.count("Medium")
+        high_count = clause_results.count("High")
+        medium_count = clause_results.count("Medium")
 
         if overall_risk == "High Risk":
             decision = "Do Not Sign Without Legal Review"
@@ -289,6 +477,13 @@ if uploaded_file:
                 "This contract includes some clauses that require attention. Reviewing and "
                 "renegotiating key terms is recommended."
             )
+        elif overall_risk == "Not Scored":
+            decision = "Nothing to Assess"
+            decision_class = "decision-review"
+            story = (
+                "No clauses could be extracted from this document, so it was not scored. "
+                "Check that the file contains the contract text."
+            )
         else:
             decision = "Safe to Sign"
             decision_class = "decision-safe"
@@ -311,25 +506,92 @@ if uploaded_file:
         </div>
         """, unsafe_allow_html=True)
 
-        audit_path = save_audit_log({
-            "overall_risk": overall_risk,
-            "total_clauses": len(clause_results)
-        })
-        st.caption(f"Audit log saved at: {audit_path}")
+        # One audit log per document per session, not one per rerun
+        audit_ids = st.session_state.setdefault("audit_ids", {})
+        if key not in audit_ids:
+            audit_ids[key] = save_audit_log({
+                "overall_risk": overall_risk,
+                "total_clauses": len(clause_results),
+                "contract_type": result["contract_type"]["type"],
+                "risk_counts": clause_results.risk_counts(),
+                "clause_types": clause_results.type_counts(),
+                "document_hash": doc_hash,
+                "from_cache": cached,
+                "nlp_mode": result["nlp_mode"],
+                "performance": result["timings"],
+                "revision": delta["counts"] if previous else None,
+                "template": result.get("template")
+            })
 
-        st.markdown('<div id="download-report" class="section-anchor"></div>', unsafe_allow_html=True)
-        if st.button("Export Risk Summary as PDF"):
-            pdf_path = generate_pdf(
-                overall_risk=overall_risk,
-                total_clauses=len(clause_results)
-            )
-            with open(pdf_path, "rb") as f:
-                st.download_button(
-                    label="Download PDF",
-                    data=f,
-                    file_name="contract_risk_summary.pdf",
-                    mime="application/pdf"
-                )
+            # Make the clauses searchable across past uploads
+            with tracer.span("clause_indexing", clauses=len(clause_results)):
+                index = get_index()
+                if index.add_result(doc_hash, uploaded_file.name, result):
+                    index.commit()
 
+        st.caption(f"Audit record {audit_ids[key]} saved to {AUDIT_DIR}/")
 
+        st.markdown('<div id="download-report" class="section-anchor"></div>', unsafe_allow_html=True)
+        with tracer.span("pdf_export", prerendered=pdf_reports[key].done()):
+            pdf_bytes = pdf_reports[key].result()
+
+        if st.download_button(
+            label="Export Risk Summary as PDF",
+            data=pdf_bytes,
+            file_name="contract_risk_summary.pdf",
+            mime="application/pdf"
+        ):
+            save_audit_log({
+                "event": "pdf_export",
+                "document_hash": doc_hash,
+                "performance": tracer.to_list()
+            })
 
+    if PERF_TRACING and st.sidebar.checkbox("Show performance"):
+        with st.expander("Performance", expanded=True):
+            if cached:
+                st.caption("Analysis served from cache; stage timings are from the original run.")
+
+            spans = result["timings"] + tracer.to_list()
+            rows = perf.flatten_spans(spans)
+            memory_profiled = any(memory for *_, memory in rows)
+            st.table([
+                dict(
+                    {
+                        "Stage": "\u2003" * depth + name,
+                        "ms": ms,
+                        "Counts": ", ".join(f"{k}: {v}" for k, v in counts.items())
+                    },
+                    **({
+                        "Peak KB": memory["peak_kb"] if memory else None,
+                        "Retained KB": memory["retained_kb"] if memory else None
+                    } if memory_profiled else {})
+                )
+                for depth, name, ms, counts, memory in rows
+            ])
+            if any(memory and memory.get("shared") for *_, memory in rows):
+                st.caption("Memory is measured per process; another analysis ran at the same time, so these figures include its allocations.")
+
+            for span in spans:
+                sites = (span.get("memory") or {}).get("top_sites")
+                if sites:
+                    st.caption(f"Top allocation sites: {span['name']}")
+                    st.table([
+                        {"Site": site["site"], "KB": site["kb"], "Blocks": site["count"], "Code": site["line"]}
+                        for site in sites
+                    ])
+
+with st.sidebar.expander("Search analyzed contracts"):
+    search_phrase = st.text_input("Phrase", placeholder="e.g. unlimited liability")
+    search_types = st.multiselect("Clause types", list(RISK_PATTERNS))
+    if search_phrase or search_types:
+        hits = get_index().search(search_phrase, search_types, limit=200)
+        st.caption(f"{len(hits)} matching clauses")
+        if hits:
+            st.table([
+                {"Contract": hit["contract"], "Clause": hit["clause"], "Offset": hit["offset"]}
+                for hit in hits
+            ])
+
+with st.sidebar.expander("Analysis cache"):
+    st.json(get_cache().stats())
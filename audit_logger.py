@@ -1,22 +1,342 @@
+import atexit
 import json
+import logging
 import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
 from datetime import datetime
 
 
-def save_audit_log(data: dict) -> str:
+# Append-only audit store
+# Records go to rotating JSONL segments through a background writer;
+# a SQLite index on timestamp, overall risk and document hash points at
+# each record's segment and byte offset.
+
+AUDIT_DIR = "audit_logs"
+INDEX_FILE = "audit_index.sqlite"
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+# Longest flush() and close() wait for the writer before giving up, in seconds
+FLUSH_TIMEOUT = 30.0
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    event TEXT,
+    overall_risk TEXT,
+    document_hash TEXT,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_ts ON records (ts);
+CREATE INDEX IF NOT EXISTS records_risk_ts ON records (overall_risk, ts);
+CREATE INDEX IF NOT EXISTS records_hash_ts ON records (document_hash, ts);
+"""
+
+
+class AuditStore:
     """
-    Saves an audit log locally as JSON.
-    Used for confidentiality & traceability.
+    Buffered, append-only audit log.
+
+    fsync: "always" syncs after every written batch, "interval" at most
+    every fsync_interval seconds, "never" leaves it to the OS.
+    Segments rotate when they reach max_segment_bytes or get older than
+    max_segment_age seconds.
+    """
+
+    def __init__(
+        self,
+        directory=AUDIT_DIR,
+        fsync="interval",
+        fsync_interval=1.0,
+        max_segment_bytes=64 * 1024 * 1024,
+        max_segment_age=24 * 3600,
+        flush_interval=0.2
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.flush_interval = flush_interval
+
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+        self._queue = queue.Queue()
+        self._segment = None
+        self._segment_name = None
+        self._segment_size = 0
+        self._segment_opened = 0.0
+        self._segment_seq = 0
+        self._last_fsync = time.monotonic()
+        self._closed = False
+
+        self._writer = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # Writing
+
+    def append(self, data: dict, timestamp: float = None) -> str:
+        """
+        Queues a record and returns its id. The write happens in the background.
+        timestamp (epoch seconds) defaults to now. The record is serialized
+        here, so values JSON can't encode raise in the caller.
+        """
+        if self._closed:
+            raise RuntimeError("audit store is closed")
+
+        now = time.time() if timestamp is None else timestamp
+        record = {
+            "timestamp": datetime.fromtimestamp(now).isoformat(timespec="microseconds"),
+            **data,
+            "id": uuid.uuid4().hex
+        }
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self._queue.put((now, record, line))
+        return record["id"]
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT) -> bool:
+        """
+        Blocks until every queued record is written and indexed, or for at
+        most timeout seconds. Returns False if the writer didn't catch up.
+        """
+        if not self._writer.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = FLUSH_TIMEOUT):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+        if self._writer.is_alive():
+            logger.warning("audit writer did not finish within %.0f s; queued records may be lost", timeout)
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+
+            # Buffer records for up to flush_interval; flush requests skip the wait
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                remaining = deadline - time.monotonic() if batch and not waiters and not stop else 0
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    break
+
+            try:
+                if batch:
+                    self._write_batch(conn, batch)
+            except Exception:
+                # A failed batch is dropped; the writer carries on with the next
+                logger.exception("audit writer failed to write %d record(s)", len(batch))
+                self._drop_segment()
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+            if stop:
+                break
+
+        if self._segment:
+            self._sync(force=True)
+            self._segment.close()
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        rows = []
+        for ts, record, line in batch:
+            self._rotate_if_needed(len(line))
+            self._segment.write(line)
+            rows.append((
+                record["id"], ts, record.get("event", "analysis"),
+                record.get("overall_risk"), record.get("document_hash"),
+                self._segment_name, self._segment_size, len(line)
+            ))
+            self._segment_size += len(line)
+
+        self._segment.flush()
+        self._sync(force=self.fsync == "always")
+
+        with conn:
+            conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _drop_segment(self):
+        # After a failed write the segment's size is unknown; start a fresh one
+        if self._segment is None:
+            return
+        try:
+            self._segment.close()
+        except OSError:
+            pass
+        self._segment = None
+
+    def _sync(self, force=False):
+        if self.fsync == "never" or self._segment is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._segment.fileno())
+            self._last_fsync = now
+
+    def _rotate_if_needed(self, incoming: int):
+        if self._segment is not None:
+            too_big = self._segment_size + incoming > self.max_segment_bytes and self._segment_size > 0
+            too_old = time.time() - self._segment_opened > self.max_segment_age
+            if not (too_big or too_old):
+                return
+            self._segment.flush()
+            self._sync(force=True)
+            self._segment.close()
+
+        # pid in the name keeps concurrent processes out of each other's segments
+        self._segment_seq += 1
+        self._segment_name = (
+            f"audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{self._segment_seq:04d}.jsonl"
+        )
+        self._segment = open(os.path.join(self.directory, self._segment_name), "ab")
+        self._segment_size = self._segment.tell()
+        self._segment_opened = time.time()
+
+    # Querying
+
+    def query(self, start=None, end=None, overall_risk=None, document_hash=None, event=None, limit=None):
+        """
+        Returns records matching all given filters, oldest first.
+        start and end are datetimes or epoch seconds (end exclusive).
+        """
+        self.flush()
+
+        where, params = self._filters(start, end, overall_risk, document_hash, event)
+        sql = f"SELECT segment, offset, length FROM records{where} ORDER BY ts"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        with self._connect() as conn:
+            locations = conn.execute(sql, params).fetchall()
+
+        records = []
+        handles = {}
+        try:
+            for segment, offset, length in locations:
+                if segment not in handles:
+                    handles[segment] = open(os.path.join(self.directory, segment), "rb")
+                f = handles[segment]
+                f.seek(offset)
+                records.append(json.loads(f.read(length)))
+        finally:
+            for f in handles.values():
+                f.close()
+        return records
+
+    def count_by_risk(self, start=None, end=None, event="analysis") -> dict:
+        """
+        Number of records per overall risk level, answered from the index alone.
+        """
+        self.flush()
+
+        where, params = self._filters(start, end, None, None, event)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT overall_risk, COUNT(*) FROM records{where} GROUP BY overall_risk", params
+            ).fetchall()
+        return {risk: count for risk, count in rows}
+
+    @staticmethod
+    def _filters(start, end, overall_risk, document_hash, event):
+        clauses, params = [], []
+        for column, op, value in (
+            ("ts", ">=", start),
+            ("ts", "<", end),
+            ("overall_risk", "=", overall_risk),
+            ("document_hash", "=", document_hash),
+            ("event", "=", event)
+        ):
+            if value is None:
+                continue
+            if isinstance(value, datetime):
+                value = value.timestamp()
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def import_legacy_logs(store: "AuditStore", directory=AUDIT_DIR) -> int:
     """
+    Appends the old one-file-per-call audit_*.json logs to the store
+    (oldest first), so they become queryable. Returns how many were imported.
+    """
+    imported = 0
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("audit_") and name.endswith(".json")):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            data = json.load(f)
 
-    os.makedirs("audit_logs", exist_ok=True)
+        # audit_YYYYMMDD_HHMMSS[_ffffff].json
+        stamp = name[len("audit_"):-len(".json")]
+        try:
+            ts = datetime.strptime(stamp[:15], "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            ts = os.path.getmtime(os.path.join(directory, name))
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_path = f"audit_logs/audit_{timestamp}.json"
+        store.append({"legacy_file": name, **data}, timestamp=ts)
+        imported += 1
+    store.flush()
+    return imported
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
 
-    return file_path
+_store = None
+_store_lock = threading.Lock()
 
 
+def get_store() -> AuditStore:
+    """
+    Process-wide audit store. AUDIT_FSYNC selects the fsync policy.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AuditStore(fsync=os.environ.get("AUDIT_FSYNC", "interval"))
+                atexit.register(_store.close)
+    return _store
+
+
+def save_audit_log(data: dict) -> str:
+    """
+    Appends an audit record to the local audit store.
+    Used for confidentiality & traceability.
+    Returns the record id.
+    """
+    return get_store().append(data)
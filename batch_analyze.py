@@ -0,0 +1,212 @@
+# batch_analyze.py
+
+# Headless batch analysis of contract files
+# Streams one JSON result per contract (JSONL)
+#
+# Usage:
+#   python batch_analyze.py contracts/ --workers 8 --output results.jsonl
+#   python batch_analyze.py "archive/**/*.pdf" > results.jsonl
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from analysis import analyze_contract, open_document, clause_text
+from analysis_cache import document_hash
+
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# Binary clause results written with --clause-store
+STORE_EXTENSION = ".clauses"
+
+
+def collect_paths(inputs: list) -> list:
+    """
+    Expands directories (recursively) and glob patterns into a sorted,
+    de-duplicated list of supported contract files.
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in files:
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        paths.add(os.path.join(root, name))
+        else:
+            for path in glob.glob(item, recursive=True):
+                if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS):
+                    paths.add(path)
+    return sorted(paths)
+
+
+def init_worker():
+    # Load the spaCy model once per worker process
+    from nlp_pipeline import get_nlp
+
+    get_nlp()
+
+
+def analyze_bytes(data: bytes, filename: str, streaming=False, include_clauses=True, clause_languages=False,
+                  store_dir=None, full_nlp=False, file=None) -> dict:
+    """
+    Analyzes one document and returns its JSON-serializable result record.
+    With store_dir the clause results are also saved there as a binary
+    ClauseStore file named after the document hash.
+    file is an open file with the same bytes to read from instead of data.
+    """
+    started = time.perf_counter()
+
+    result = analyze_contract(
+        file if file is not None else open_document(data, filename),
+        streaming=streaming,
+        clause_languages=clause_languages,
+        full_nlp=full_nlp,
+        keep_text=include_clauses
+    )
+
+    clauses = result["clauses"]
+    record = {
+        "document_hash": document_hash(data),
+        "language": result["language"],
+        "language_confidence": result["language_confidence"],
+        "contract_type": result["contract_type"]["type"],
+        "contract_type_confidence": result["contract_type"]["confidence"],
+        "overall_risk": result["overall_risk"],
+        "total_clauses": len(clauses),
+        "risk_counts": clauses.risk_counts(),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+    if include_clauses:
+        record["clauses"] = [
+            dict(clause, text=clause_text(result, clause)) for clause in clauses
+        ]
+    if store_dir:
+        record["clause_store"] = os.path.join(store_dir, record["document_hash"] + STORE_EXTENSION)
+        clauses.save(record["clause_store"])
+    return record
+
+
+def analyze_path(path: str, streaming=False, include_clauses=True, clause_languages=False, store_dir=None,
+                 full_nlp=False) -> dict:
+    """
+    Analyzes one file; failures are reported in the record instead of raised.
+    """
+    try:
+        with open(path, "rb") as f:
+            # Hashed through a memory map; the analysis reads the file itself
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                data = b""
+
+            try:
+                record = analyze_bytes(
+                    data, path, streaming, include_clauses, clause_languages, store_dir, full_nlp, file=f
+                )
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+
+    return {"path": path, **record}
+
+
+def run_batch(paths, out, workers=None, streaming=False, include_clauses=True, clause_languages=False,
+              store_dir=None, full_nlp=False) -> dict:
+    """
+    Analyzes paths across a worker pool and writes each record to out as
+    soon as it is ready (completion order). Returns summary counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = {"total": len(paths), "ok": 0, "errors": 0}
+
+    def emit(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        summary["errors" if "error" in record else "ok"] += 1
+
+    if workers == 1:
+        init_worker()
+        for path in paths:
+            emit(analyze_path(path, streaming, include_clauses, clause_languages, store_dir, full_nlp))
+        return summary
+
+    # Keep a bounded number of files in flight so huge backlogs stay cheap
+    pending_paths = iter(paths)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        in_flight = set()
+
+        def submit_next():
+            path = next(pending_paths, None)
+            if path is not None:
+                in_flight.add(pool.submit(
+                    analyze_path, path, streaming, include_clauses, clause_languages, store_dir, full_nlp
+                ))
+
+        for _ in range(workers * 4):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.discard(future)
+                emit(future.result())
+                submit_next()
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyze contract files (PDF, DOCX, TXT) and write JSONL results."
+    )
+    parser.add_argument("inputs", nargs="+", help="Directories, files or glob patterns")
+    parser.add_argument("-o", "--output", help="Output JSONL file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--streaming", action="store_true", help="Split clauses page by page (large files)")
+    parser.add_argument("--clause-languages", action="store_true", help="Tag clauses en/hi and apply per-language rules")
+    parser.add_argument("--full-nlp", action="store_true", help="Run spaCy on every clause, not only flagged ones")
+    parser.add_argument("--summary-only", action="store_true", help="Omit per-clause results")
+    parser.add_argument("--clause-store", metavar="DIR", help="Also save compact binary clause results (one file per document)")
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.inputs)
+    if not paths:
+        print("No PDF, DOCX or TXT files found.", file=sys.stderr)
+        return 1
+
+    if args.clause_store:
+        os.makedirs(args.clause_store, exist_ok=True)
+
+    started = time.perf_counter()
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = run_batch(
+            paths,
+            out,
+            workers=args.workers,
+            streaming=args.streaming,
+            include_clauses=not args.summary_only,
+            clause_languages=args.clause_languages,
+            store_dir=args.clause_store,
+            full_nlp=args.full_nlp
+        )
+    finally:
+        if args.output:
+            out.close()
+
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(summary), file=sys.stderr)
+    return 0 if summary["errors"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
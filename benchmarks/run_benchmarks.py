@@ -0,0 +1,181 @@
+# benchmarks/run_benchmarks.py
+
+# Per-stage benchmark suite over synthetic contracts
+#
+# Usage (from the repository root):
+#   python -m benchmarks.run_benchmarks --sizes 50 200 1000 --output bench.json
+#   python -m benchmarks.run_benchmarks --compare bench.json --threshold 1.3
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.synthetic import generate_contract, WRITERS
+from utils import extract_text, detect_language
+from clause_extraction import extract_clauses, split_clauses
+from risk_engine import detect_clause_types, assess_risk_level, contract_risk_score
+from nlp_pipeline import analyze_clause, get_nlp
+
+
+def _time(fn, repeats: int):
+    """
+    Runs fn repeats times; returns (best seconds, last result).
+    """
+    best = None
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _open(path: str):
+    with open(path, "rb") as f:
+        file = io.BytesIO(f.read())
+    file.name = path
+    return file
+
+
+def bench_size(num_clauses: int, formats: list, risk_density: float, repeats: int, workdir: str) -> dict:
+    text = generate_contract(num_clauses, risk_density=risk_density, seed=num_clauses)
+    stages = {}
+
+    for fmt in formats:
+        path = WRITERS[fmt](text, os.path.join(workdir, f"contract_{num_clauses}.{fmt}"))
+        stages[f"extract_text[{fmt}]"], _ = _time(lambda: extract_text(_open(path)), repeats)
+
+    stages["detect_language"], _ = _time(lambda: detect_language(text), repeats)
+    stages["extract_clauses"], clauses = _time(lambda: extract_clauses(text), repeats)
+    stages["split_clauses"], _ = _time(lambda: split_clauses(text), repeats)
+    stages["detect_clause_types"], _ = _time(lambda: [detect_clause_types(c) for c in clauses], repeats)
+    stages["assess_risk_level"], risk_levels = _time(lambda: [assess_risk_level(c) for c in clauses], repeats)
+    stages["analyze_clause"], _ = _time(lambda: [analyze_clause(c) for c in clauses], repeats)
+
+    if risk_levels:
+        stages["contract_risk_score"], overall = _time(lambda: contract_risk_score(risk_levels), repeats)
+    else:
+        overall = None
+
+    # generate_pdf is imported lazily like in the app; it writes into ./pdf_reports
+    from pdf_export import generate_pdf
+
+    stages["generate_pdf"], _ = _time(
+        lambda: generate_pdf(overall_risk=overall or "Low Risk", total_clauses=len(clauses)),
+        repeats
+    )
+
+    return {
+        "num_clauses": num_clauses,
+        "characters": len(text),
+        "clauses_found": len(clauses),
+        "overall_risk": overall,
+        "seconds": {stage: round(t, 6) for stage, t in stages.items()}
+    }
+
+
+def scaling_exponents(results: list) -> dict:
+    """
+    Log-log slope of each stage between the smallest and largest size:
+    about 1.0 is linear, about 2.0 quadratic.
+    """
+    if len(results) < 2:
+        return {}
+
+    small, large = results[0], results[-1]
+    size_ratio = math.log(large["num_clauses"] / small["num_clauses"])
+    exponents = {}
+    for stage, t_large in large["seconds"].items():
+        t_small = small["seconds"].get(stage)
+        if t_small and t_large and size_ratio:
+            exponents[stage] = round(math.log(t_large / t_small) / size_ratio, 2)
+    return exponents
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Lists stages that got slower than threshold x baseline at the same size.
+    """
+    regressions = []
+    baseline_by_size = {r["num_clauses"]: r for r in baseline["results"]}
+
+    for result in current["results"]:
+        base = baseline_by_size.get(result["num_clauses"])
+        if not base:
+            continue
+        for stage, seconds in result["seconds"].items():
+            base_seconds = base["seconds"].get(stage)
+            if base_seconds and seconds > base_seconds * threshold:
+                regressions.append({
+                    "num_clauses": result["num_clauses"],
+                    "stage": stage,
+                    "baseline": base_seconds,
+                    "current": seconds,
+                    "ratio": round(seconds / base_seconds, 2)
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage contract pipeline benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000], help="Clause counts")
+    parser.add_argument("--formats", nargs="+", default=["txt", "docx", "pdf"], choices=sorted(WRITERS))
+    parser.add_argument("--risk-density", type=float, default=0.3)
+    parser.add_argument("--repeats", type=int, default=3, help="Best of N runs per stage")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    # Keep model loading out of the analyze_clause timings
+    get_nlp()
+
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for size in sorted(args.sizes):
+                print(f"benchmarking {size} clauses...", file=sys.stderr)
+                results.append(bench_size(size, args.formats, args.risk_density, args.repeats, workdir))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": args.repeats,
+        "risk_density": args.risk_density,
+        "results": results,
+        "scaling_exponents": scaling_exponents(results)
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['stage']} @ {r['num_clauses']} clauses: "
+                f"{r['baseline']:.4f}s -> {r['current']:.4f}s (x{r['ratio']})",
+                file=sys.stderr
+            )
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# benchmarks/synthetic.py
+
+# Deterministic synthetic contract generator for benchmarks
+# Headings follow the split patterns in clause_extraction.extract_clauses
+
+import random
+import textwrap
+
+from risk_engine import RISK_PATTERNS
+
+
+HEADING_STYLES = ["numbered", "section", "article", "lettered", "paragraph"]
+
+FILLER_SENTENCES = [
+    "The Service Provider shall perform the services with due care and skill.",
+    "All invoices shall be payable within thirty days of receipt by the Client.",
+    "Each party shall keep the terms of this Agreement strictly confidential.",
+    "Notices under this Agreement shall be given in writing to the registered office.",
+    "The Client shall provide reasonable access to its premises during business hours.",
+    "This Agreement constitutes the entire understanding between the parties.",
+    "Any amendment to this Agreement shall be valid only if made in writing.",
+    "The Service Provider shall maintain adequate records of all work performed.",
+    "Taxes applicable under Indian law shall be borne as stated in the schedule.",
+    "Neither party shall be liable for delays caused by events beyond its control."
+]
+
+_ROMAN = [(10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
+
+
+def _roman(n: int) -> str:
+    out = ""
+    for value, numeral in _ROMAN:
+        while n >= value:
+            out += numeral
+            n -= value
+    return out
+
+
+def _heading(style: str, index: int) -> str:
+    if style == "numbered":
+        return f"{index}. "
+    if style == "section":
+        return f"Section {_roman(min(index, 39))} "
+    if style == "article":
+        return f"ARTICLE {index} "
+    if style == "lettered":
+        return f"({chr(ord('a') + (index - 1) % 26)}) "
+    return ""
+
+
+def generate_contract(num_clauses=100, risk_density=0.3, heading_styles=None, seed=0) -> str:
+    """
+    Builds contract text with num_clauses clauses.
+    risk_density is the chance that a clause contains a RISK_PATTERNS keyword.
+    heading_styles cycles through HEADING_STYLES names; "paragraph" clauses
+    are separated by blank lines only.
+    """
+    rng = random.Random(seed)
+    styles = heading_styles or HEADING_STYLES
+    keywords = [k for kws in RISK_PATTERNS.values() for k in kws]
+
+    parts = ["MASTER SERVICES AGREEMENT\n\nThis Agreement is made between the Client and the Service Provider."]
+    for i in range(1, num_clauses + 1):
+        sentences = rng.sample(FILLER_SENTENCES, rng.randint(2, 4))
+        if rng.random() < risk_density:
+            keyword = rng.choice(keywords)
+            sentences.insert(rng.randint(0, len(sentences)), f"The parties agree that {keyword} applies here.")
+
+        style = styles[(i - 1) % len(styles)]
+        separator = "\n\n" if style == "paragraph" else "\n"
+        parts.append(separator + _heading(style, i) + " ".join(sentences))
+
+    return "".join(parts) + "\n"
+
+
+def write_txt(text: str, path: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def write_docx(text: str, path: str) -> str:
+    from docx import Document
+
+    doc = Document()
+    for line in text.split("\n"):
+        doc.add_paragraph(line)
+    doc.save(path)
+    return path
+
+
+def write_pdf(text: str, path: str) -> str:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    y = height - 40
+
+    for line in text.split("\n"):
+        for wrapped in textwrap.wrap(line, 95) or [""]:
+            if y < 40:
+                c.showPage()
+                y = height - 40
+            c.drawString(40, y, wrapped)
+            y -= 14
+
+    c.save()
+    return path
+
+
+WRITERS = {"txt": write_txt, "docx": write_docx, "pdf": write_pdf}
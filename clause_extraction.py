@@ -1,36 +1,171 @@
 import re
 
 
-def extract_clauses(text: str) -> list:
+# Common clause heading patterns, by kind
+# Each pattern's optional "number_<kind>" group captures the clause number
+CLAUSE_HEADINGS = [
+    ("numbered", r"\n\s*(?P<number_numbered>\d+)\.\s+"),            # 1. 2. 3.
+    ("section", r"\n\s*Section\s+(?P<number_section>[A-Z0-9]+)"),   # Section IX
+    ("article", r"\n\s*ARTICLE\s+(?P<number_article>[A-Z0-9]+)"),   # ARTICLE IV
+    ("lettered", r"\n\s*\((?P<number_lettered>[a-z])\)\s+"),        # (a) (b)
+    ("paragraph", r"\n\s*\n+")                                      # blank lines
+]
+
+# One precompiled pass; m.lastgroup names the heading kind that matched
+CLAUSE_SPLIT_RE = re.compile("|".join(f"(?P<{kind}>{pattern})" for kind, pattern in CLAUSE_HEADINGS))
+
+_NON_SPACE_RE = re.compile(r"\S")
+
+# Ignore very small junk text
+MIN_CLAUSE_LENGTH = 50
+
+
+class ClauseRecord:
     """
-    Splits contract text into clauses using headings,
-    numbering, and paragraph breaks.
+    A clause as offsets into its source text.
+    kind is the heading that introduced it ("start" for the opening text)
+    and number the parsed clause number, if the heading had one.
+    offset is the clause position in the whole document.
+    """
+
+    __slots__ = ("source", "start", "end", "kind", "number", "offset")
+
+    def __init__(self, source, start, end, kind="start", number=None, offset=None):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.number = number
+        self.offset = start if offset is None else offset
+
+    @property
+    def text(self) -> str:
+        return self.source[self.start:self.end]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"ClauseRecord({self.kind!r}, {self.number!r}, {self.offset}, {len(self)} chars)"
+
+
+def _heading(m):
+    kind = m.lastgroup
+    number = m.group(f"number_{kind}") if kind != "paragraph" else None
+    return kind, number
+
+
+def _stripped_span(source: str, start: int, end: int):
+    # Same bounds as source[start:end].strip(), without copying
+    m = _NON_SPACE_RE.search(source, start, end)
+    if m is None:
+        return start, start
+    start = m.start()
+    while end > start and source[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _split(buffer: str, limit: int, heading):
+    """
+    Splits buffer at every split match starting before limit.
+    Returns the clause records, the offset where the unsplit tail begins
+    and the heading that introduces that tail.
+    """
+    records = []
+    pos = 0
+
+    for m in CLAUSE_SPLIT_RE.finditer(buffer):
+        if m.start() >= limit:
+            break
+
+        start, end = _stripped_span(buffer, pos, m.start())
+        if end - start > MIN_CLAUSE_LENGTH:
+            records.append(ClauseRecord(buffer, start, end, *heading))
+        pos = m.end()
+        heading = _heading(m)
+
+    return records, pos, heading
+
+
+def _stable_limit(buffer: str) -> int:
     """
+    Start of the third-to-last word in buffer.
+
+    A split pattern reads at most a whitespace run, two words and one
+    more character, so any match attempt starting before this point
+    has the same outcome however the text continues.
+    """
+    i = len(buffer)
+    for _ in range(3):
+        while i > 0 and buffer[i - 1].isspace():
+            i -= 1
+        while i > 0 and not buffer[i - 1].isspace():
+            i -= 1
+        if i == 0:
+            return 0
+    return i
+
 
+def split_clauses(text: str) -> list:
+    """
+    Splits contract text into ClauseRecords in one finditer pass.
+    Offsets refer to text (carriage returns count as line breaks).
+    """
     if not text:
         return []
 
-    # Normalize text
-    text = text.replace("\r", "\n")
+    # No copy when there is nothing to replace
+    source = text.replace("\r", "\n")
+
+    records, pos, heading = _split(source, len(source), ("start", None))
+
+    start, end = _stripped_span(source, pos, len(source))
+    if end - start > MIN_CLAUSE_LENGTH:
+        records.append(ClauseRecord(source, start, end, *heading))
+
+    return records
+
 
-    # Split on common clause patterns
-    patterns = [
-        r"\n\s*\d+\.\s+",              # 1. 2. 3.
-        r"\n\s*Section\s+[A-Z0-9]+",   # Section IX
-        r"\n\s*ARTICLE\s+[A-Z0-9]+",   # ARTICLE IV
-        r"\n\s*\([a-z]\)\s+",          # (a) (b)
-        r"\n\s*\n+"                    # blank lines
-    ]
+def iter_clauses(chunks, separator=" "):
+    """
+    Incremental clause splitter over an iterable of text chunks (e.g. pages).
+    Chunks are treated as joined with separator, and each clause is yielded
+    as soon as the text that follows it makes its end final, so clauses
+    spanning chunk boundaries come out whole.
+
+    Yields standalone ClauseRecords (source is the clause text itself);
+    offset is the clause position in the joined document.
+    """
+    buffer = None
+    base = 0
+    heading = ("start", None)
+
+    def detach(record):
+        return ClauseRecord(record.text, 0, len(record), record.kind, record.number, base + record.start)
+
+    for chunk in chunks:
+        chunk = chunk.replace("\r", "\n")
+        buffer = chunk if buffer is None else buffer + separator.replace("\r", "\n") + chunk
+
+        records, pos, heading = _split(buffer, _stable_limit(buffer), heading)
+        for record in records:
+            yield detach(record)
 
-    split_regex = "|".join(patterns)
-    raw_clauses = re.split(split_regex, text)
+        buffer = buffer[pos:]
+        base += pos
 
-    # Clean clauses
-    clauses = []
-    for clause in raw_clauses:
-        clause = clause.strip()
-        if len(clause) > 50:  # ignore very small junk text
-            clauses.append(clause)
+    if buffer:
+        for record in split_clauses(buffer):
+            if record.kind == "start":
+                record.kind, record.number = heading
+            yield detach(record)
 
-    return clauses
 
+def extract_clauses(text: str) -> list:
+    """
+    Splits contract text into clauses using headings,
+    numbering, and paragraph breaks.
+    """
+
+    return [record.text for record in split_clauses(text)]
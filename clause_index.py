@@ -0,0 +1,770 @@
+# clause_index.py
+
+# Persistent inverted index over analyzed clauses
+# Maps words and detected risk categories to (contract, clause, offset)
+# postings, so past contracts can be searched without re-uploading them
+#
+# Usage:
+#   python batch_analyze.py contracts/ -o results.jsonl
+#   python clause_index.py add results.jsonl
+#   python clause_index.py search "unlimited indemnity" --category "Indemnity Clause"
+
+import argparse
+import heapq
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+INDEX_DIR = "clause_index"
+CATALOG_FILE = "catalog.sqlite"
+
+# Tiered merging: segments are grouped by size into tiers growing by
+# SEGMENTS_PER_TIER; once a tier holds that many segments they are merged
+# into one of the next tier. Segments under TIER_FLOOR postings share tier 0
+SEGMENTS_PER_TIER = 8
+TIER_FLOOR = 4096
+
+# Category and risk-level postings live next to the words under these
+# prefixes (a tokenized word never starts with "#")
+CATEGORY_PREFIX = "#type:"
+RISK_PREFIX = "#risk:"
+
+# One posting per word occurrence: a sorted int64 key packing (contract,
+# clause, word position in the clause), and the character offset of the
+# word in the contract text. Keys and offsets are separate arrays so
+# lookups binary-search the mapped keys without touching anything else
+_CLAUSE_BITS = 20
+_POSITION_BITS = 20
+MAX_DOCS = 1 << (63 - _CLAUSE_BITS - _POSITION_BITS)
+MAX_CLAUSES = 1 << _CLAUSE_BITS
+MAX_POSITIONS = 1 << _POSITION_BITS
+
+# Words are runs of letters/digits; Devanagari vowel signs are kept
+# inside the word so Hindi terms index whole
+_TOKEN_RE = re.compile(r"[^\W_][\wऀ-ॿ]*")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contracts (
+    doc INTEGER PRIMARY KEY,
+    document_hash TEXT UNIQUE NOT NULL,
+    name TEXT,
+    clauses INTEGER NOT NULL,
+    added REAL NOT NULL,
+    segment TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str):
+    """
+    Yields (word, character offset) pairs, lower-cased.
+    """
+    for m in _TOKEN_RE.finditer(text):
+        yield m.group().lower(), m.start()
+
+
+def pack_key(doc: int, clause: int, position: int = 0) -> int:
+    return (((doc << _CLAUSE_BITS) | clause) << _POSITION_BITS) | position
+
+
+def _clause_part(keys: np.ndarray) -> np.ndarray:
+    # Keys with the word position cleared (category postings use 0)
+    return (keys >> _POSITION_BITS) << _POSITION_BITS
+
+
+def _concat_sorted(parts) -> tuple:
+    # Concatenates (keys, offsets) pairs into key order. Segments written
+    # by different processes can interleave doc ids, so order isn't a given
+    keys = np.concatenate([part[0] for part in parts])
+    offsets = np.concatenate([part[1] for part in parts])
+    if len(keys) > 1 and (keys[1:] < keys[:-1]).any():
+        order = np.argsort(keys, kind="stable")
+        keys, offsets = keys[order], offsets[order]
+    return keys, offsets
+
+
+def _tier(postings: int, segments_per_tier: int) -> int:
+    tier, limit = 0, TIER_FLOOR * segments_per_tier
+    while postings >= limit:
+        tier += 1
+        limit *= segments_per_tier
+    return tier
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    # Mask of keys found in the sorted array sorted_keys
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    found = np.searchsorted(sorted_keys, keys).clip(max=len(sorted_keys) - 1)
+    return sorted_keys[found] == keys
+
+
+def _without_docs(postings_by_term: dict, docs: set) -> dict:
+    # Buffered postings with those of the given doc ids removed
+    kept = {}
+    for term, entries in postings_by_term.items():
+        entries = [entry for entry in entries if entry[0] >> (_CLAUSE_BITS + _POSITION_BITS) not in docs]
+        if entries:
+            kept[term] = entries
+    return kept
+
+
+class Segment:
+    """
+    One immutable on-disk segment: a sorted term table and key/offset
+    arrays (.npy), all memory-mapped, never read into memory whole.
+
+    The term table is the UTF-8 bytes of every term in sorted order
+    (.terms.npy) and, per term, its byte start and first posting
+    (.term_index.npy, with one closing row), so a term is found by binary
+    search over the mapped table.
+    """
+
+    __slots__ = ("name", "term_bytes", "term_index", "keys", "offsets")
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        path = os.path.join(directory, name)
+        self.term_bytes = np.load(path + ".terms.npy", mmap_mode="r")
+        self.term_index = np.load(path + ".term_index.npy", mmap_mode="r")
+        self.keys = np.load(path + ".keys.npy", mmap_mode="r")
+        self.offsets = np.load(path + ".offsets.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.term_index) - 1
+
+    def term(self, number: int) -> bytes:
+        start, stop = self.term_index[number, 0], self.term_index[number + 1, 0]
+        return self.term_bytes[start:stop].tobytes()
+
+    def find(self, term: bytes) -> int:
+        """
+        Number of a term (UTF-8 encoded) in the term table, or -1.
+        """
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self) and self.term(low) == term else -1
+
+    def span(self, term: str) -> tuple:
+        """
+        (start, stop) of a term's postings; (0, 0) when it is not in the segment.
+        """
+        number = self.find(term.encode("utf-8"))
+        if number < 0:
+            return 0, 0
+        return int(self.term_index[number, 1]), int(self.term_index[number + 1, 1])
+
+    def postings(self, number: int) -> tuple:
+        start, stop = self.term_index[number, 1], self.term_index[number + 1, 1]
+        return self.keys[start:stop], self.offsets[start:stop]
+
+    def lookup(self, term: str) -> tuple:
+        """
+        (keys, offsets) of a term; empty when the term is not in the segment.
+        """
+        start, stop = self.span(term)
+        return self.keys[start:stop], self.offsets[start:stop]
+
+
+SEGMENT_FILES = (".keys.npy", ".offsets.npy", ".terms.npy", ".term_index.npy")
+
+
+# Segment files are written under a temporary name and renamed into place,
+# so readers never see half a file
+
+def _save(directory: str, name: str, suffix: str, array: np.ndarray):
+    tmp = os.path.join(directory, name + ".tmp" + suffix)
+    np.save(tmp, array)
+    os.replace(tmp, os.path.join(directory, name + suffix))
+
+
+def _open_output(directory: str, name: str, suffix: str, dtype, shape) -> np.memmap:
+    tmp = os.path.join(directory, name + ".tmp" + suffix)
+    return np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+
+
+def _publish(directory: str, name: str, suffix: str, array: np.memmap):
+    array.flush()
+    os.replace(os.path.join(directory, name + ".tmp" + suffix), os.path.join(directory, name + suffix))
+
+
+def _write_segment(directory: str, name: str, postings_by_term: dict):
+    # postings_by_term: term -> list of (key, offset) tuples in key order,
+    # as buffered by ClauseIndex.add
+    terms = sorted((term.encode("utf-8"), entries) for term, entries in postings_by_term.items())
+    term_index = np.zeros((len(terms) + 1, 2), dtype=np.int64)
+    term_index[1:, 0] = np.cumsum([len(term) for term, _ in terms], dtype=np.int64)
+    term_index[1:, 1] = np.cumsum([len(entries) for _, entries in terms], dtype=np.int64)
+
+    entries = [entry for _, term_entries in terms for entry in term_entries]
+    _save(directory, name, ".keys.npy", np.array([entry[0] for entry in entries], dtype=np.int64))
+    _save(directory, name, ".offsets.npy", np.array([entry[1] for entry in entries], dtype=np.int64))
+    _save(directory, name, ".terms.npy", np.frombuffer(b"".join(term for term, _ in terms), dtype=np.uint8))
+    _save(directory, name, ".term_index.npy", term_index)
+
+
+def _convert_json_terms(directory: str, name: str):
+    # Segments written before the term table was an array had it as JSON
+    # ({term: [start, stop]}, terms in sorted order)
+    path = os.path.join(directory, name + ".terms.json")
+    with open(path, encoding="utf-8") as f:
+        spans = json.load(f)
+    terms = sorted((term.encode("utf-8"), span) for term, span in spans.items())
+    term_index = np.zeros((len(terms) + 1, 2), dtype=np.int64)
+    term_index[1:, 0] = np.cumsum([len(term) for term, _ in terms], dtype=np.int64)
+    term_index[:-1, 1] = [span[0] for _, span in terms]
+    term_index[-1, 1] = terms[-1][1][1] if terms else 0
+    _save(directory, name, ".terms.npy", np.frombuffer(b"".join(term for term, _ in terms), dtype=np.uint8))
+    _save(directory, name, ".term_index.npy", term_index)
+    os.remove(path)
+
+
+def _segment_terms(number: int, segment: Segment):
+    for term_number in range(len(segment)):
+        yield segment.term(term_number), number, term_number
+
+
+def _merged_terms(segments: list):
+    # (term, [(segment, term number), ...]) over the union of the segments'
+    # term tables, in sorted order, read one term at a time
+    current, owners = None, []
+    for term, number, term_number in heapq.merge(*(
+        _segment_terms(number, segment) for number, segment in enumerate(segments)
+    )):
+        if term != current:
+            if owners:
+                yield current, owners
+            current, owners = term, []
+        owners.append((segments[number], term_number))
+    if owners:
+        yield current, owners
+
+
+def _write_merged_segment(directory: str, name: str, segments: list):
+    # Two passes over the merged term tables: the first sizes the outputs,
+    # the second copies each term's postings from the mapped inputs into
+    # preallocated .npy files, so only one term is in memory at a time
+    term_count = term_bytes = 0
+    for term, _ in _merged_terms(segments):
+        term_count += 1
+        term_bytes += len(term)
+    postings = sum(len(segment.keys) for segment in segments)
+
+    out_terms = _open_output(directory, name, ".terms.npy", np.uint8, (term_bytes,))
+    out_index = _open_output(directory, name, ".term_index.npy", np.int64, (term_count + 1, 2))
+    out_keys = _open_output(directory, name, ".keys.npy", np.int64, (postings,))
+    out_offsets = _open_output(directory, name, ".offsets.npy", np.int64, (postings,))
+
+    byte = position = 0
+    for number, (term, owners) in enumerate(_merged_terms(segments)):
+        out_index[number] = byte, position
+        out_terms[byte:byte + len(term)] = np.frombuffer(term, dtype=np.uint8)
+        byte += len(term)
+
+        start = position
+        for segment, term_number in owners:
+            keys, offsets = segment.postings(term_number)
+            out_keys[position:position + len(keys)] = keys
+            out_offsets[position:position + len(keys)] = offsets
+            position += len(keys)
+
+        # Segments written by different processes can interleave doc ids
+        if len(owners) > 1:
+            keys = out_keys[start:position]
+            if (keys[1:] < keys[:-1]).any():
+                order = np.argsort(keys, kind="stable")
+                out_keys[start:position] = keys[order]
+                out_offsets[start:position] = out_offsets[start:position][order]
+    out_index[term_count] = byte, position
+
+    for suffix, array in ((".keys.npy", out_keys), (".offsets.npy", out_offsets),
+                          (".terms.npy", out_terms), (".term_index.npy", out_index)):
+        _publish(directory, name, suffix, array)
+
+
+class ClauseIndex:
+    """
+    Append-only inverted index in a directory of immutable segments.
+
+    add() buffers contracts in memory; commit() writes them as a new
+    segment. Searches read all committed segments through memory maps.
+    Merges run on a background thread (background_merges) or when merge()
+    is called, never inside commit().
+    """
+
+    def __init__(self, directory=INDEX_DIR, segments_per_tier=SEGMENTS_PER_TIER, background_merges=True):
+        self.directory = directory
+        self.segments_per_tier = segments_per_tier
+        self.background_merges = background_merges
+
+        os.makedirs(directory, exist_ok=True)
+        self.catalog_path = os.path.join(directory, CATALOG_FILE)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+        self._lock = threading.RLock()
+        self._segments = {}
+        self._pending = {}
+        self._pending_docs = []
+        self._merge_wanted = threading.Event()
+        self._merger = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.catalog_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _allocate_doc(self) -> int:
+        # BEGIN IMMEDIATE takes the write lock before reading the counter,
+        # so the app and the CLI never hand out the same id
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT value FROM counters WHERE name = 'next_doc'").fetchone()
+            if row is None:
+                row = conn.execute("SELECT COALESCE(MAX(doc), -1) + 1 FROM contracts").fetchone()
+            doc = row[0]
+            conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('next_doc', ?)", (doc + 1,))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return doc
+
+    # Writing
+
+    def contains(self, document_hash: str) -> bool:
+        with self._lock:
+            if any(doc[1] == document_hash for doc in self._pending_docs):
+                return True
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM contracts WHERE document_hash = ?", (document_hash,)
+            ).fetchone()
+        return row is not None
+
+    def add(self, document_hash: str, name: str, clauses) -> bool:
+        """
+        Buffers one contract. clauses yields (clause_id, start, text, types,
+        risk) with start the clause's character offset in the contract.
+        Returns False if the document is already indexed.
+        """
+        # Checked and buffered under one lock hold, so two sessions adding
+        # the same upload can't both buffer it
+        with self._lock:
+            if self.contains(document_hash):
+                return False
+
+            doc = self._allocate_doc()
+            if doc >= MAX_DOCS:
+                raise ValueError(f"Clause index is full ({MAX_DOCS} contracts)")
+
+            postings = {}
+            count = 0
+            for clause_id, start, text, types, risk in clauses:
+                count += 1
+                if clause_id >= MAX_CLAUSES:
+                    raise ValueError(f"Only the first {MAX_CLAUSES - 1} clauses of a contract can be indexed")
+
+                # Words past MAX_POSITIONS stay unindexed
+                for position, (word, offset) in zip(range(MAX_POSITIONS), tokenize(text)):
+                    postings.setdefault(word, []).append((pack_key(doc, clause_id, position), start + offset))
+
+                tags = [CATEGORY_PREFIX + clause_type for clause_type in types]
+                if risk:
+                    tags.append(RISK_PREFIX + risk)
+                for tag in tags:
+                    postings.setdefault(tag, []).append((pack_key(doc, clause_id), start))
+
+            # Merged only once the whole contract was read
+            for term, entries in postings.items():
+                self._pending.setdefault(term, []).extend(entries)
+            self._pending_docs.append((doc, document_hash, name, count))
+        return True
+
+    def add_result(self, document_hash: str, name: str, result: dict) -> bool:
+        """
+        Buffers an analyze_contract result (or a batch_analyze record with
+        clause texts).
+        """
+        from analysis import clause_text
+
+        return self.add(document_hash, name, (
+            (clause["id"], clause["start"], clause_text(result, clause), clause["types"], clause["risk"])
+            for clause in result["clauses"]
+        ))
+
+    def commit(self) -> str:
+        """
+        Writes buffered contracts as a new segment and returns its name
+        (None when nothing was buffered). With background_merges, wakes the
+        merge thread instead of merging here. If writing fails, the segment
+        files are removed and the buffer is kept for another commit().
+        """
+        with self._lock:
+            if not self._pending_docs:
+                return None
+
+            # The write lock is held from the duplicate check to the insert,
+            # so contracts another process committed since add() are dropped
+            # instead of failing the UNIQUE document_hash
+            conn = self._connect()
+            conn.isolation_level = None
+            name = None
+            committed = False
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                indexed = {
+                    doc for doc, doc_hash, _, _ in self._pending_docs
+                    if conn.execute("SELECT 1 FROM contracts WHERE document_hash = ?", (doc_hash,)).fetchone()
+                }
+                if indexed:
+                    logger.info("skipping %d contracts indexed by another process", len(indexed))
+                    self._pending = _without_docs(self._pending, indexed)
+                    self._pending_docs = [entry for entry in self._pending_docs if entry[0] not in indexed]
+
+                if self._pending_docs:
+                    name = f"seg_{time.time_ns():020d}"
+                    _write_segment(self.directory, name, self._pending)
+
+                    now = time.time()
+                    conn.execute("INSERT INTO segments (name, created) VALUES (?, ?)", (name, now))
+                    conn.executemany(
+                        "INSERT INTO contracts (doc, document_hash, name, clauses, added, segment) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(doc, doc_hash, doc_name, count, now, name)
+                         for doc, doc_hash, doc_name, count in self._pending_docs]
+                    )
+                conn.execute("COMMIT")
+                committed = True
+            finally:
+                if not committed:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    if name is not None:
+                        self._remove_segment_files(name)
+                conn.close()
+
+            self._pending = {}
+            self._pending_docs = []
+            if name is None:
+                return None
+
+            if self.background_merges:
+                if self._merger is None:
+                    self._merger = threading.Thread(target=self._merge_loop, name="clause-index-merge", daemon=True)
+                    self._merger.start()
+                self._merge_wanted.set()
+            return name
+
+    def _merge_loop(self):
+        while True:
+            self._merge_wanted.wait()
+            self._merge_wanted.clear()
+            try:
+                self.merge()
+            except Exception:
+                logger.exception("clause index merge failed")
+
+    def merge(self) -> list:
+        """
+        Merges every full size tier (see SEGMENTS_PER_TIER), repeating
+        while merged segments fill the next tier up. Each posting is
+        rewritten about once per tier. Returns the new segment names.
+        """
+        merged = []
+        while True:
+            with self._lock:
+                tiers = {}
+                for name in self._segment_names():
+                    postings = len(self._segment(name).keys)
+                    tiers.setdefault(_tier(postings, self.segments_per_tier), []).append(name)
+            full = [names for _, names in sorted(tiers.items()) if len(names) >= self.segments_per_tier]
+            if not full:
+                return merged
+            name = self._merge_segments(full[0][:self.segments_per_tier])
+            if name is None:
+                return merged
+            merged.append(name)
+
+    def compact(self) -> str:
+        """
+        Merges all segments into one.
+        """
+        names = self._segment_names()
+        if len(names) < 2:
+            return names[0] if names else None
+        return self._merge_segments(names)
+
+    def _merge_segments(self, names: list) -> str:
+        # Reads and writes outside the lock (segments are immutable), so
+        # searches and commits carry on; only the catalog swap is locked.
+        # Returns None if another process merged any of them first
+        with self._lock:
+            segments = [self._segment(name) for name in names]
+
+        name = f"seg_{time.time_ns():020d}"
+        try:
+            _write_merged_segment(self.directory, name, segments)
+        except BaseException:
+            self._remove_segment_files(name)
+            raise
+        del segments
+
+        with self._lock:
+            conn = self._connect()
+            conn.isolation_level = None
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                placeholders = ",".join("?" * len(names))
+                (present,) = conn.execute(
+                    f"SELECT COUNT(*) FROM segments WHERE name IN ({placeholders})", names
+                ).fetchone()
+                if present == len(names):
+                    conn.execute("INSERT INTO segments (name, created) VALUES (?, ?)", (name, time.time()))
+                    conn.executemany("DELETE FROM segments WHERE name = ?", [(old,) for old in names])
+                    conn.execute(f"UPDATE contracts SET segment = ? WHERE segment IN ({placeholders})", [name, *names])
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+            if present != len(names):
+                self._remove_segment_files(name)
+                return None
+            for old in names:
+                self._segments.pop(old, None)
+                self._remove_segment_files(old)
+        return name
+
+    def _remove_segment_files(self, name: str):
+        # Including any temporary files of a write that failed
+        for suffix in SEGMENT_FILES:
+            for path in (name + suffix, name + ".tmp" + suffix):
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except OSError:
+                    # Missing, or still mapped elsewhere (Windows); left behind unreferenced
+                    pass
+
+    # Reading
+
+    def _segment_names(self) -> list:
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT name FROM segments ORDER BY name")]
+
+    def _segment(self, name: str) -> Segment:
+        segment = self._segments.get(name)
+        if segment is None:
+            if not os.path.exists(os.path.join(self.directory, name + ".term_index.npy")):
+                _convert_json_terms(self.directory, name)
+            segment = self._segments[name] = Segment(self.directory, name)
+        return segment
+
+    def _postings(self, term: str, segments: list) -> tuple:
+        # (keys, offsets) of a term over all segments, in key order
+        parts = [segment.lookup(term) for segment in segments]
+        parts = [part for part in parts if len(part[0])]
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        return _concat_sorted(parts)
+
+    def _contains_term(self, term: str, segments: list, keys: np.ndarray) -> np.ndarray:
+        # Binary-searches each segment's mapped keys, so frequent words are
+        # never copied or scanned
+        mask = np.zeros(len(keys), dtype=bool)
+        for segment in segments:
+            mask |= _contains(segment.lookup(term)[0], keys)
+        return mask
+
+    def _term_size(self, term: str, segments: list) -> int:
+        return sum(span[1] - span[0] for span in (segment.span(term) for segment in segments))
+
+    def _phrase(self, words: list, segments: list) -> tuple:
+        # (keys, offsets) of the first word wherever the whole phrase follows
+        if len(words) == 1:
+            return self._postings(words[0], segments)
+
+        # Candidates are phrase-start keys, taken from the rarest word and
+        # checked against the others shifted by their place in the phrase
+        order = sorted(range(len(words)), key=lambda shift: self._term_size(words[shift], segments))
+        candidates = self._postings(words[order[0]], segments)[0] - order[0]
+        for shift in order[1:]:
+            if not len(candidates):
+                break
+            candidates = candidates[self._contains_term(words[shift], segments, candidates + shift)]
+
+        # Character offsets come from the first word's postings
+        offsets = np.empty(len(candidates), dtype=np.int64)
+        for segment in segments:
+            keys, segment_offsets = segment.lookup(words[0])
+            found = _contains(keys, candidates)
+            offsets[found] = segment_offsets[np.searchsorted(keys, candidates[found])]
+        return candidates, offsets
+
+    def search(self, phrase: str = None, categories=(), risk: str = None, limit: int = 100) -> list:
+        """
+        Clauses containing phrase (exact word sequence, case-insensitive)
+        and detected as every one of categories (and of risk level risk).
+        Returns up to limit hits ordered by contract and clause.
+        """
+        filters = [CATEGORY_PREFIX + category for category in categories]
+        if risk:
+            filters.append(RISK_PREFIX + risk)
+        words = [word for word, _ in tokenize(phrase or "")]
+        if not words and not filters:
+            return []
+
+        with self._lock:
+            segments = [self._segment(name) for name in self._segment_names()]
+
+            if words:
+                keys, offsets = self._phrase(words, segments)
+            else:
+                filters.sort(key=lambda term: self._term_size(term, segments))
+                keys, offsets = self._postings(filters.pop(0), segments)
+
+            for term in filters:
+                found = self._contains_term(term, segments, _clause_part(keys))
+                keys, offsets = keys[found], offsets[found]
+
+        if limit:
+            keys, offsets = keys[:limit], offsets[:limit]
+        if not len(keys):
+            return []
+
+        docs_of_hits = (keys >> (_CLAUSE_BITS + _POSITION_BITS)).tolist()
+        clauses_of_hits = ((keys >> _POSITION_BITS) & (MAX_CLAUSES - 1)).tolist()
+        docs = sorted(set(docs_of_hits))
+        with self._connect() as conn:
+            contracts = {
+                row[0]: row[1:]
+                for row in conn.execute(
+                    f"SELECT doc, document_hash, name FROM contracts WHERE doc IN ({','.join('?' * len(docs))})",
+                    docs
+                )
+            }
+
+        return [
+            {
+                "contract": contracts[doc][1],
+                "document_hash": contracts[doc][0],
+                "clause": clause,
+                "offset": offset
+            }
+            for doc, clause, offset in zip(docs_of_hits, clauses_of_hits, offsets.tolist())
+        ]
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            contracts, clauses = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(clauses), 0) FROM contracts"
+            ).fetchone()
+        names = self._segment_names()
+        return {
+            "contracts": contracts,
+            "clauses": clauses,
+            "segments": len(names),
+            "postings": sum(len(self._segment(name).keys) for name in names),
+            "pending_contracts": len(self._pending_docs)
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ClauseIndex:
+    """
+    Process-wide clause index in CLAUSE_INDEX_DIR (default clause_index/).
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ClauseIndex(os.environ.get("CLAUSE_INDEX_DIR", INDEX_DIR))
+    return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search analyzed contracts by phrase and risk category.")
+    parser.add_argument("--index", default=os.environ.get("CLAUSE_INDEX_DIR", INDEX_DIR), help="Index directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Index batch_analyze JSONL results (with clauses)")
+    add.add_argument("results", nargs="+")
+
+    search = commands.add_parser("search", help="Find clauses by phrase and/or category")
+    search.add_argument("phrase", nargs="?")
+    search.add_argument("--category", action="append", default=[], help="Detected clause type (repeatable)")
+    search.add_argument("--risk", choices=("High", "Medium", "Low"))
+    search.add_argument("--limit", type=int, default=100)
+    search.add_argument("--contracts", action="store_true", help="List matching contracts only")
+
+    commands.add_parser("merge", help="Merge full size tiers of segments")
+    commands.add_parser("compact", help="Merge all segments into one")
+    commands.add_parser("stats", help="Show index size")
+    args = parser.parse_args(argv)
+
+    index = ClauseIndex(args.index, background_merges=False)
+
+    if args.command == "add":
+        added = skipped = 0
+        for path in args.results:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line) if line.strip() else None
+                    if not record or "clauses" not in record:
+                        continue
+                    if index.add_result(record["document_hash"], record.get("path"), record):
+                        added += 1
+                    else:
+                        skipped += 1
+        index.commit()
+        index.merge()
+        print(json.dumps({"added": added, "already_indexed": skipped}))
+    elif args.command == "search":
+        if not args.phrase and not args.category and not args.risk:
+            parser.error("search needs a phrase, --category or --risk")
+        started = time.perf_counter()
+        hits = index.search(args.phrase, args.category, args.risk, limit=None if args.contracts else args.limit)
+        if args.contracts:
+            hits = list({hit["document_hash"]: hit["contract"] for hit in hits}.items())[:args.limit]
+        for hit in hits:
+            print(json.dumps(hit, ensure_ascii=False))
+        print(f"{len(hits)} results in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    elif args.command == "merge":
+        print(json.dumps(index.merge()))
+    elif args.command == "compact":
+        print(index.compact())
+    else:
+        print(json.dumps(index.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
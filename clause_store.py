@@ -0,0 +1,332 @@
+# clause_store.py
+
+# Columnar container for clause analysis results
+# One compact array per field instead of one dict per clause
+
+import io
+import json
+import struct
+import sys
+from array import array
+from itertools import compress
+
+from risk_engine import RISK_PATTERNS, RISK_SCORES
+
+
+# Risk codes match the contract_risk_score weights
+RISK_CODES = dict(RISK_SCORES)
+RISK_NAMES = {code: level for level, code in RISK_CODES.items()}
+
+# Type bits follow the rule table order, so decoded type lists come out
+# in the same order scan_clause reports them
+BASE_TYPES = list(RISK_PATTERNS) + ["General"]
+
+# Risk areas of the PDF report and the clause types behind each
+PDF_RISK_AREAS = {
+    "Penalty Clauses": ("Penalty Clause",),
+    "Indemnity Clauses": ("Indemnity Clause",),
+    "Termination Risks": ("Unilateral Termination",),
+    "IP Ownership Risks": ("IP Transfer",),
+    "Arbitration / Jurisdiction": ("Arbitration & Jurisdiction",)
+}
+
+MAGIC = b"CLST"
+FORMAT_VERSION = 1
+
+# column name -> array typecode; string columns hold indexes into
+# ClauseStore.strings (0 is None)
+COLUMNS = (
+    ("ids", "I"),
+    ("starts", "Q"),
+    ("ends", "Q"),
+    ("risk", "b"),
+    ("types", "Q"),
+    ("headings", "I"),
+    ("numbers", "I"),
+    ("explanations", "I"),
+    ("reasons", "I"),
+    ("languages", "I")
+)
+
+_HEADER = struct.Struct("<4sHI")
+_LENGTH = struct.Struct("<Q")
+
+
+class ClauseStore:
+    """
+    Clause results of one contract as parallel arrays.
+
+    Repeated strings (headings, explanations, languages...) are interned
+    once; clause types are a bitmask over type_names. Iterating or
+    indexing yields the same clause dicts analyze_contract used to return.
+    """
+
+    __slots__ = ("type_names", "strings", "texts", "_type_bits", "_string_ids") + tuple(
+        name for name, _ in COLUMNS
+    )
+
+    def __init__(self, type_names=None, strings=None, texts=None):
+        self.type_names = list(type_names or BASE_TYPES)
+        self.strings = list(strings or [None])
+        self.texts = texts
+        self._type_bits = {name: 1 << bit for bit, name in enumerate(self.type_names)}
+        self._string_ids = {s: i for i, s in enumerate(self.strings)}
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> dict:
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self.row(index)
+
+    def __repr__(self):
+        return f"ClauseStore({len(self)} clauses)"
+
+    def __getstate__(self):
+        return self.to_bytes()
+
+    def __setstate__(self, state):
+        loaded = ClauseStore.from_bytes(state)
+        for name in ClauseStore.__slots__:
+            setattr(self, name, getattr(loaded, name))
+
+    def _intern(self, value) -> int:
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def type_mask(self, clause_types) -> int:
+        """
+        Bitmask of clause types; unknown types get the next free bit.
+        """
+        mask = 0
+        for clause_type in clause_types:
+            bit = self._type_bits.get(clause_type)
+            if bit is None:
+                if len(self.type_names) == 64:
+                    raise ValueError("ClauseStore supports at most 64 clause types")
+                bit = self._type_bits[clause_type] = 1 << len(self.type_names)
+                self.type_names.append(clause_type)
+            mask |= bit
+        return mask
+
+    def append(self, clause: dict):
+        """
+        Adds one clause dict (the analyze_contract clause shape).
+        """
+        self.ids.append(clause["id"])
+        self.starts.append(clause["start"])
+        self.ends.append(clause["end"])
+        self.risk.append(RISK_CODES[clause["risk"]])
+        self.types.append(self.type_mask(clause["types"]))
+        self.headings.append(self._intern(clause["heading"]))
+        self.numbers.append(self._intern(clause["number"]))
+        self.explanations.append(self._intern(clause["explanation"]))
+        self.reasons.append(self._intern(clause["why_it_matters"]))
+        self.languages.append(self._intern(clause.get("language")))
+
+        if "text" in clause:
+            if self.texts is None:
+                self.texts = [None] * (len(self.ids) - 1)
+            self.texts.append(clause["text"])
+        elif self.texts is not None:
+            self.texts.append(None)
+
+    @classmethod
+    def from_dicts(cls, clauses) -> "ClauseStore":
+        store = cls()
+        for clause in clauses:
+            store.append(clause)
+        return store
+
+    def decode_types(self, mask: int) -> list:
+        return [name for bit, name in enumerate(self.type_names) if mask >> bit & 1]
+
+    def row(self, index: int) -> dict:
+        """
+        Clause dict at a position (not a clause id).
+        """
+        strings = self.strings
+        clause = {
+            "id": self.ids[index],
+            "start": self.starts[index],
+            "end": self.ends[index],
+            "heading": strings[self.headings[index]],
+            "number": strings[self.numbers[index]],
+            "risk": RISK_NAMES[self.risk[index]],
+            "types": self.decode_types(self.types[index]),
+            "explanation": strings[self.explanations[index]],
+            "why_it_matters": strings[self.reasons[index]]
+        }
+
+        if self.languages[index]:
+            clause["language"] = strings[self.languages[index]]
+
+        if self.texts is not None and self.texts[index] is not None:
+            clause["text"] = self.texts[index]
+
+        return clause
+
+    def position(self, clause_id: int) -> int:
+        """
+        Position of a clause id (ids are 1..n in document order).
+        """
+        if 0 < clause_id <= len(self.ids) and self.ids[clause_id - 1] == clause_id:
+            return clause_id - 1
+        return self.ids.index(clause_id)
+
+    # Filters and counts work on the arrays directly
+
+    def filter(self, risk=None, clause_type=None, language=None) -> list:
+        """
+        Positions of clauses matching every given condition. risk and
+        clause_type may be a single value or a collection of values.
+        """
+        # Each condition is a per-clause selector over a whole column
+        selectors = []
+
+        if risk is not None:
+            codes = {RISK_CODES[level] for level in ([risk] if isinstance(risk, str) else risk)}
+            selectors.append([code in codes for code in self.risk])
+
+        if clause_type is not None:
+            mask = self.type_mask_of(clause_type)
+            selectors.append([types & mask != 0 for types in self.types])
+
+        if language is not None:
+            code = self._string_ids.get(language)
+            selectors.append([lang == code for lang in self.languages])
+
+        if not selectors:
+            return list(range(len(self.ids)))
+        return list(compress(range(len(self.ids)), map(all, zip(*selectors))))
+
+    def type_mask_of(self, clause_type) -> int:
+        # Like type_mask, but unknown types match nothing
+        names = [clause_type] if isinstance(clause_type, str) else clause_type
+        mask = 0
+        for name in names:
+            mask |= self._type_bits.get(name, 0)
+        return mask
+
+    def count(self, risk: str = None, clause_type: str = None) -> int:
+        if clause_type is None:
+            return self.risk.count(RISK_CODES[risk]) if risk is not None else len(self.ids)
+        return len(self.filter(risk=risk, clause_type=clause_type))
+
+    def any_type(self, clause_type: str) -> bool:
+        mask = self.type_mask_of(clause_type)
+        return mask != 0 and any(types & mask for types in self.types)
+
+    def risk_levels(self) -> list:
+        return [RISK_NAMES[code] for code in self.risk]
+
+    def risk_counts(self) -> dict:
+        return {level: self.risk.count(RISK_CODES[level]) for level in ("High", "Medium", "Low")}
+
+    def type_counts(self) -> dict:
+        counts = {}
+        for bit, name in enumerate(self.type_names):
+            count = sum(1 for types in self.types if types >> bit & 1)
+            if count:
+                counts[name] = count
+        return counts
+
+    def risk_summary(self) -> dict:
+        """
+        Risk areas for the PDF report, detected from the clause types.
+        """
+        return {
+            area: any(self.any_type(clause_type) for clause_type in clause_types)
+            for area, clause_types in PDF_RISK_AREAS.items()
+        }
+
+    # Binary format: header, JSON string tables, raw little-endian
+    # columns, then the optional clause texts
+
+    def to_bytes(self) -> bytes:
+        out = io.BytesIO()
+        out.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(self.ids)))
+
+        meta = json.dumps({
+            "type_names": self.type_names,
+            "strings": self.strings,
+            "has_text": self.texts is not None
+        }, ensure_ascii=False).encode("utf-8")
+        out.write(_LENGTH.pack(len(meta)))
+        out.write(meta)
+
+        for name, _ in COLUMNS:
+            column = getattr(self, name)
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            out.write(column.tobytes())
+
+        if self.texts is not None:
+            encoded = [(text or "").encode("utf-8") for text in self.texts]
+            lengths = array("Q", (len(text) for text in encoded))
+            missing = array("b", (text is None for text in self.texts))
+            if sys.byteorder == "big":
+                lengths.byteswap()
+            out.write(lengths.tobytes())
+            out.write(missing.tobytes())
+            out.write(b"".join(encoded))
+
+        return out.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ClauseStore":
+        view = memoryview(data)
+        magic, version, count = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a clause store file (or an unsupported version)")
+        pos = _HEADER.size
+
+        (meta_length,) = _LENGTH.unpack_from(view, pos)
+        pos += _LENGTH.size
+        meta = json.loads(bytes(view[pos:pos + meta_length]).decode("utf-8"))
+        pos += meta_length
+
+        store = cls(meta["type_names"], meta["strings"])
+        for name, typecode in COLUMNS:
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(view[pos:pos + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            setattr(store, name, column)
+            pos += size
+
+        if meta["has_text"]:
+            lengths = array("Q")
+            lengths.frombytes(view[pos:pos + lengths.itemsize * count])
+            if sys.byteorder == "big":
+                lengths.byteswap()
+            pos += lengths.itemsize * count
+            missing = view[pos:pos + count].tolist()
+            pos += count
+
+            store.texts = []
+            for length, is_missing in zip(lengths, missing):
+                text = bytes(view[pos:pos + length]).decode("utf-8")
+                store.texts.append(None if is_missing else text)
+                pos += length
+
+        return store
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "ClauseStore":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
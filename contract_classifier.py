@@ -0,0 +1,159 @@
+# contract_classifier.py
+
+# Contract type classification
+# Weighted keyword evidence per contract type, scored as a small linear
+# model over keyword counts
+
+import numpy as np
+
+from risk_engine import get_matcher
+
+
+# Contract types and their keywords with evidence weights
+# Titles are strong evidence; recurring role and subject terms add up
+CONTRACT_TYPE_PATTERNS = {
+    "Employment Contract": {
+        "employment agreement": 6, "employment contract": 6, "contract of employment": 6,
+        "offer of employment": 4, "appointment letter": 4,
+        "employee": 2, "employer": 2, "salary": 2, "probation": 2,
+        "provident fund": 2, "gratuity": 2, "designation": 1,
+        "working hours": 1, "notice period": 1,
+        "रोजगार": 3, "कर्मचारी": 2, "नियोक्ता": 2, "वेतन": 2
+    },
+    "Service Agreement": {
+        "service agreement": 6, "services agreement": 6, "consultancy agreement": 5,
+        "scope of services": 3, "service provider": 3, "statement of work": 3,
+        "service level": 2, "deliverables": 2, "professional fees": 2,
+        "consultant": 1,
+        "सेवा अनुबंध": 4, "सेवा प्रदाता": 3
+    },
+    "Vendor Agreement": {
+        "vendor agreement": 6, "supply agreement": 6, "purchase agreement": 5,
+        "purchase order": 3, "procurement": 2, "vendor": 2, "supplier": 2,
+        "goods": 1, "invoice": 1, "quantity": 1,
+        "आपूर्ति": 3, "विक्रेता": 3
+    },
+    "Lease Agreement": {
+        "lease agreement": 6, "rent agreement": 6, "rental agreement": 6, "leave and license": 6,
+        "lessor": 3, "lessee": 3, "landlord": 3, "tenant": 3, "monthly rent": 3,
+        "licensor": 2, "security deposit": 2, "premises": 2,
+        "किरायेदार": 3, "किराया": 3, "मकान मालिक": 3, "पट्टा": 3
+    },
+    "Partnership Deed": {
+        "partnership deed": 6, "partnership agreement": 6, "indian partnership act": 4,
+        "partnership firm": 3, "profit sharing": 3, "share of profits": 3,
+        "capital contribution": 3, "partners": 2,
+        "साझेदारी": 4, "साझेदार": 3
+    }
+}
+
+# Returned when no type has clearly more evidence than this prior score
+GENERAL_TYPE = "General Contract"
+GENERAL_PRIOR = 3.0
+
+# Softmax temperature: one unit of confidence per this much score margin
+TEMPERATURE = 2.0
+
+# Contract type shows in the title and opening clauses; only this much
+# leading text is read
+CLASSIFY_CHARS = 20000
+
+
+class ContractClassifier:
+    """
+    Linear contract-type model over keyword counts.
+
+    Features are log(1 + count) per keyword, so repeated terms add
+    evidence with diminishing weight; scores are features @ weights and
+    confidences their softmax against the GENERAL_TYPE prior.
+    """
+
+    def __init__(self, patterns: dict = None):
+        patterns = CONTRACT_TYPE_PATTERNS if patterns is None else patterns
+
+        self.types = list(patterns) + [GENERAL_TYPE]
+        self.keywords = []
+        columns = []
+        for column, (contract_type, keywords) in enumerate(patterns.items()):
+            for keyword, weight in keywords.items():
+                self.keywords.append(keyword)
+                columns.append((column, weight))
+        self.keyword_index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        if len(self.keyword_index) != len(self.keywords):
+            raise ValueError("A keyword may only belong to one contract type")
+
+        self.weights = np.zeros((len(self.keywords), len(self.types)), dtype=np.float32)
+        for row, (column, weight) in enumerate(columns):
+            self.weights[row, column] = weight
+
+        self.bias = np.zeros(len(self.types), dtype=np.float32)
+        self.bias[-1] = GENERAL_PRIOR
+
+        # Each keyword is its own "type" to the risk engine's matcher, so
+        # one regex pass counts them all
+        self.keyword_table = {keyword: [keyword] for keyword in self.keywords}
+        self.matcher = get_matcher(self.keyword_table)
+
+    def features(self, texts) -> np.ndarray:
+        """
+        Keyword feature matrix, shape (documents, keywords).
+        """
+        rows = []
+        for text in texts:
+            row = np.zeros(len(self.keywords), dtype=np.float32)
+            scan = self.matcher.scan((text or "")[:CLASSIFY_CHARS])
+            for _, _, keyword in scan["matches"]:
+                row[self.keyword_index[keyword]] += 1
+            rows.append(row)
+
+        if not rows:
+            return np.zeros((0, len(self.keywords)), dtype=np.float32)
+        return np.log1p(np.vstack(rows))
+
+    def probabilities(self, features: np.ndarray) -> np.ndarray:
+        """
+        Type probabilities for a feature matrix, shape (documents, types).
+        """
+        scores = (features @ self.weights + self.bias) / TEMPERATURE
+        scores -= scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def classify_many(self, texts) -> list:
+        """
+        Classifies many documents in one matrix product.
+        """
+        probabilities = self.probabilities(self.features(texts))
+        best = probabilities.argmax(axis=1)
+        return [
+            {
+                "type": self.types[index],
+                "confidence": round(float(row[index]), 4),
+                "scores": {name: round(float(p), 4) for name, p in zip(self.types, row)}
+            }
+            for index, row in zip(best.tolist(), probabilities)
+        ]
+
+
+_classifier = None
+
+
+def get_classifier() -> ContractClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = ContractClassifier()
+    return _classifier
+
+
+def classify_contract(text: str) -> dict:
+    """
+    Contract type of one document as {"type", "confidence", "scores"}.
+    """
+    return get_classifier().classify_many([text])[0]
+
+
+def classify_contracts(texts) -> list:
+    """
+    Batch version of classify_contract.
+    """
+    return get_classifier().classify_many(texts)
@@ -0,0 +1,248 @@
+# near_duplicates.py
+
+# Near-duplicate contract detection
+# MinHash signatures over clause fingerprints, banded into a local SQLite
+# LSH index, so a contract derived from a house template can reuse the
+# template's per-clause analysis
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from clause_store import ClauseStore
+
+
+TEMPLATE_DIR = "template_index"
+INDEX_FILE = "near_duplicates.sqlite"
+
+# 64 hash functions in 16 bands of 4 rows: contracts sharing about half
+# their clauses or more almost always land in a common bucket
+NUM_PERM = 64
+BANDS = 16
+
+# Estimated clause-set similarity needed to reuse a template
+MATCH_THRESHOLD = 0.6
+
+# Candidates checked per lookup (the most frequent bucket hits first)
+MAX_CANDIDATES = 32
+
+# Fixed seed: signatures must be comparable across runs
+MINHASH_SEED = 0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contracts (
+    id INTEGER PRIMARY KEY,
+    document_hash TEXT UNIQUE NOT NULL,
+    name TEXT,
+    signature BLOB NOT NULL,
+    template INTEGER,
+    config TEXT,
+    payload BLOB,
+    added REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    contract INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, contract)
+) WITHOUT ROWID;
+"""
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of analyzed contracts.
+
+    Contracts that match no earlier template become templates themselves
+    and store their clause results (without text) as the reuse payload;
+    the others only record which template they matched.
+    """
+
+    def __init__(self, path=None, num_perm=NUM_PERM, bands=BANDS, threshold=MATCH_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        if path is None:
+            os.makedirs(TEMPLATE_DIR, exist_ok=True)
+            path = os.path.join(TEMPLATE_DIR, INDEX_FILE)
+
+        self.path = path
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        rng = np.random.default_rng(MINHASH_SEED)
+        self._xors = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._multipliers = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+
+        # One connection for the life of the index keeps lookups cheap
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Signatures
+
+    def signature(self, fingerprints) -> np.ndarray:
+        """
+        MinHash signature of a contract's set of clause fingerprints
+        (hex digests, see revisions.clause_fingerprint).
+        """
+        values = np.array(sorted({int(f[:16], 16) for f in fingerprints}), dtype=np.uint64)
+        if not len(values):
+            return np.full(len(self._xors), np.iinfo(np.uint64).max, dtype=np.uint64)
+
+        # Multiply-xorshift hash family; uint64 arithmetic wraps around
+        hashed = (values[:, None] ^ self._xors) * self._multipliers
+        hashed ^= hashed >> np.uint64(31)
+        return hashed.min(axis=0)
+
+    def _buckets(self, signature: np.ndarray) -> list:
+        return [
+            (band, int.from_bytes(
+                hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                "little",
+                signed=True
+            ))
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """
+        Estimated Jaccard similarity of the two clause sets.
+        """
+        return float(np.mean(a == b))
+
+    # Lookup and insertion
+
+    def find(self, signature: np.ndarray, config: str = None):
+        """
+        Best matching template for a signature as (template dict, similarity),
+        or (None, best similarity seen). The template dict has id,
+        document_hash, name and payload; templates stored under another
+        config (rule set / model) are not returned.
+        """
+        buckets = self._buckets(signature)
+        with self._lock:
+            # One primary-key point lookup per band
+            candidates = self._conn.execute(
+                "SELECT contract, COUNT(*) AS hits FROM ("
+                + " UNION ALL ".join(["SELECT contract FROM bands WHERE band = ? AND bucket = ?"] * len(buckets))
+                + ") GROUP BY contract ORDER BY hits DESC LIMIT ?",
+                [value for bucket in buckets for value in bucket] + [MAX_CANDIDATES]
+            ).fetchall()
+            if not candidates:
+                return None, 0.0
+
+            rows = self._conn.execute(
+                f"SELECT id, signature, template FROM contracts WHERE id IN ({','.join('?' * len(candidates))})",
+                [contract for contract, _ in candidates]
+            ).fetchall()
+
+            best, best_similarity = None, 0.0
+            for contract, blob, template in rows:
+                similarity = self.similarity(signature, np.frombuffer(blob, dtype=np.uint64))
+                if similarity > best_similarity:
+                    best, best_similarity = (template or contract), similarity
+
+            if best is None or best_similarity < self.threshold:
+                return None, best_similarity
+
+            row = self._conn.execute(
+                "SELECT id, document_hash, name, config, payload FROM contracts WHERE id = ?", (best,)
+            ).fetchone()
+
+        if row is None or row[4] is None or (config is not None and row[3] != config):
+            return None, best_similarity
+
+        return {
+            "id": row[0],
+            "document_hash": row[1],
+            "name": row[2],
+            "payload": pickle.loads(row[4])
+        }, best_similarity
+
+    def add(self, document_hash: str, name: str, signature: np.ndarray, result: dict = None,
+            fingerprints=None, template_id: int = None, config: str = None) -> int:
+        """
+        Records an analyzed contract. Without template_id it becomes a
+        template and result (its analyze_contract result, with the clause
+        fingerprints in document order) is stored for reuse.
+        Returns the contract id; re-adding a document is a no-op.
+        """
+        payload = None
+        if template_id is None:
+            payload = pickle.dumps(template_payload(result, fingerprints), protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock, self._conn:
+            existing = self._conn.execute(
+                "SELECT id FROM contracts WHERE document_hash = ?", (document_hash,)
+            ).fetchone()
+            if existing:
+                return existing[0]
+
+            cursor = self._conn.execute(
+                "INSERT INTO contracts (document_hash, name, signature, template, config, payload, added) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document_hash, name, signature.tobytes(), template_id, config, payload, time.time())
+            )
+            contract = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO bands (band, bucket, contract) VALUES (?, ?, ?)",
+                [(band, bucket, contract) for band, bucket in self._buckets(signature)]
+            )
+        return contract
+
+    def stats(self) -> dict:
+        with self._lock:
+            contracts, templates = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(payload IS NOT NULL), 0) FROM contracts"
+            ).fetchone()
+        return {"contracts": contracts, "templates": templates}
+
+
+def template_payload(result: dict, fingerprints) -> dict:
+    """
+    The parts of an analysis result another contract needs to reuse its
+    clause analyses (see analyze_contract(previous=...)), without any text.
+    """
+    clauses = ClauseStore.from_bytes(result["clauses"].to_bytes())
+    clauses.texts = None
+
+    return {
+        "clauses": clauses,
+        "clause_keys": [
+            (fingerprint, clause["heading"], clause["number"])
+            for fingerprint, clause in zip(fingerprints, clauses)
+        ],
+        "risk_levels": result["risk_levels"],
+        "entities": result["entities"]
+    }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_duplicate_index() -> NearDuplicateIndex:
+    """
+    Process-wide near-duplicate index (TEMPLATE_INDEX_PATH overrides the
+    default template_index/near_duplicates.sqlite).
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex(os.environ.get("TEMPLATE_INDEX_PATH"))
+    return _index
@@ -1,7 +1,9 @@
-import spacy
+import threading
 
 # Safe loader for local + cloud
 def load_nlp():
+    import spacy
+
     try:
         # Try loading full English model
         return spacy.load("en_core_web_sm")
@@ -9,23 +11,70 @@ def load_nlp():
         # Fallback for Streamlit Cloud
         return spacy.blank("en")
 
-nlp = load_nlp()
+def model_version():
+    """
+    Identifies the model load_nlp will use, without loading it.
+    """
+    from importlib.metadata import version, PackageNotFoundError
+
+    try:
+        spacy_version = version("spacy")
+    except PackageNotFoundError:
+        spacy_version = "unknown"
 
-def analyze_clause(text):
+    try:
+        return f"en_core_web_sm-{version('en_core_web_sm')}/spacy-{spacy_version}"
+    except PackageNotFoundError:
+        return f"blank-en/spacy-{spacy_version}"
+
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
     """
-    Analyze a single clause using spaCy.
-    Returns detected named entities and basic linguistic signals.
+    Returns the process-wide spaCy model, loading it on first use.
     """
-    if not text or not text.strip():
-        return {
-            "entities": [],
-            "has_obligation": False,
-            "has_prohibition": False,
-            "has_right": False
-        }
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                _nlp = load_nlp()
+    return _nlp
+
+
+def warm_up_async():
+    """
+    Starts loading the model in a background thread so the first
+    analysis does not pay for it.
+    """
+    if _nlp is None:
+        threading.Thread(target=get_nlp, daemon=True).start()
+
+
+def __getattr__(name):
+    # Keeps `nlp_pipeline.nlp` working without loading at import time
+    if name == "nlp":
+        return get_nlp()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Simple rule-based legal signal keywords
+OBLIGATION_KEYWORDS = ["shall", "must", "is required to", "has to"]
+PROHIBITION_KEYWORDS = ["shall not", "must not", "is prohibited", "may not"]
+RIGHT_KEYWORDS = ["may", "is entitled to", "has the right to"]
 
-    doc = nlp(text)
 
+def _empty_analysis():
+    return {
+        "entities": [],
+        "has_obligation": False,
+        "has_prohibition": False,
+        "has_right": False
+    }
+
+
+def _build_analysis(text, doc):
     # Named Entity Recognition
     entities = []
     for ent in doc.ents:
@@ -34,13 +83,9 @@ def analyze_clause(text):
     # Simple rule-based legal signal detection
     text_lower = text.lower()
 
-    obligation_keywords = ["shall", "must", "is required to", "has to"]
-    prohibition_keywords = ["shall not", "must not", "is prohibited", "may not"]
-    right_keywords = ["may", "is entitled to", "has the right to"]
-
-    has_obligation = any(k in text_lower for k in obligation_keywords)
-    has_prohibition = any(k in text_lower for k in prohibition_keywords)
-    has_right = any(k in text_lower for k in right_keywords)
+    has_obligation = any(k in text_lower for k in OBLIGATION_KEYWORDS)
+    has_prohibition = any(k in text_lower for k in PROHIBITION_KEYWORDS)
+    has_right = any(k in text_lower for k in RIGHT_KEYWORDS)
 
     return {
         "entities": entities,
@@ -48,3 +93,37 @@ def analyze_clause(text):
         "has_prohibition": has_prohibition,
         "has_right": has_right
     }
+
+
+def analyze_clause(text):
+    """
+    Analyze a single clause using spaCy.
+    Returns detected named entities and basic linguistic signals.
+    """
+    if not text or not text.strip():
+        return _empty_analysis()
+
+    return _build_analysis(text, get_nlp()(text))
+
+
+def analyze_clauses(texts, batch_size=64, n_process=1):
+    """
+    Analyze many clauses in one nlp.pipe run.
+    Results are returned in input order and match analyze_clause per text.
+    n_process > 1 spreads the batches over worker processes.
+    """
+    texts = list(texts)
+
+    # Blank clauses never reach spaCy, same as analyze_clause
+    results = [None if t and t.strip() else _empty_analysis() for t in texts]
+    pending = [i for i, r in enumerate(results) if r is None]
+
+    docs = get_nlp().pipe(
+        (texts[i] for i in pending),
+        batch_size=batch_size,
+        n_process=n_process
+    )
+    for i, doc in zip(pending, docs):
+        results[i] = _build_analysis(texts[i], doc)
+
+    return results
@@ -1,32 +1,161 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib import colors
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import io
 import os
+import threading
+import time
+
+from clause_store import PDF_RISK_AREAS
+
+
+REPORT_DIR = "pdf_reports"
+
+# Styles are built once per process instead of on every report
+TITLE_STYLE = ParagraphStyle(
+    "TitleStyle",
+    fontSize=22,
+    textColor=colors.white,
+    alignment=1,
+    spaceAfter=20
+)
+
+META_STYLE = ParagraphStyle(
+    "Meta",
+    fontSize=10,
+    textColor=colors.grey
+)
+
+SECTION_STYLE = ParagraphStyle(
+    "Section",
+    fontSize=14,
+    textColor=colors.HexColor("#0f172a"),
+    spaceAfter=10,
+    spaceBefore=20,
+    fontName="Helvetica-Bold"
+)
+
+BODY_STYLE = ParagraphStyle(
+    "Body",
+    fontSize=11,
+    leading=16
+)
+
+RISK_STYLE = ParagraphStyle(
+    "Risk",
+    fontSize=14,
+    textColor=colors.white,
+    alignment=1,
+    fontName="Helvetica-Bold"
+)
+
+DISCLAIMER_STYLE = ParagraphStyle("Disclaimer", fontSize=9, textColor=colors.grey)
+
+HEADER_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#0f172a")),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("PADDING", (0, 0), (-1, -1), 18)
+])
+
+RISK_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e5e7eb")),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("ALIGN", (1, 1), (-1, -1), "CENTER")
+])
+
+RISK_BOX_STYLES = {
+    risk: TableStyle([
+        ("BACKGROUND", (0, 0), (-1, -1), color),
+        ("PADDING", (0, 0), (-1, -1), 14)
+    ])
+    for risk, color in (
+        ("High Risk", colors.red),
+        ("Medium Risk", colors.orange),
+        ("Low Risk", colors.green),
+        ("Not Scored", colors.lightgrey)
+    )
+}
+
+
+_static = None
+
+# Static flowables are shared between builds, so builds run one at a time
+_build_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-prerender")
+
+
+def _static_flowables() -> dict:
+    """
+    Header, executive summary, recommendations and disclaimer never change,
+    so they are parsed once and reused by every report.
+    """
+    global _static
+    if _static is None:
+        header_bg = Table(
+            [[Paragraph("Contract Risk Assessment Summary", TITLE_STYLE)]],
+            colWidths=[480]
+        )
+        header_bg.setStyle(HEADER_TABLE_STYLE)
+
+        _static = {
+            "header": header_bg,
+            "contract_info_title": Paragraph("Contract Information", SECTION_STYLE),
+            "summary_title": Paragraph("Executive Summary", SECTION_STYLE),
+            "summary": Paragraph(
+                """
+                This contract was automatically analyzed using an AI-assisted legal risk assessment engine
+                designed for small and medium businesses. The analysis identifies potential legal, financial,
+                and operational risks based on common contractual patterns.
+                <br/><br/>
+                The assessment highlights clauses related to penalties, termination rights, indemnities,
+                intellectual property ownership, and dispute resolution mechanisms. Business owners are
+                strongly advised to review high-risk clauses carefully and seek professional legal advice
+                before signing.
+                """,
+                BODY_STYLE
+            ),
+            "risk_areas_title": Paragraph("Key Risk Areas Detected", SECTION_STYLE),
+            "recommendations_title": Paragraph("Business Recommendations", SECTION_STYLE),
+            "recommendations": Paragraph(
+                """
+                <b>Recommended Actions:</b><br/><br/>
+                • Review all high-risk clauses carefully before signing.<br/>
+                • Renegotiate one-sided termination, penalty, or indemnity clauses.<br/>
+                • Clarify intellectual property ownership and usage rights.<br/>
+                • Ensure dispute resolution and jurisdiction terms are acceptable.<br/><br/>
+                <b>Signing Guidance:</b><br/>
+                This report is intended to assist decision-making but should not replace professional
+                legal consultation for critical contracts.
+                """,
+                BODY_STYLE
+            ),
+            "disclaimer": Paragraph(
+                "<i>Disclaimer: This report is generated for informational purposes only and does not constitute legal advice.</i>",
+                DISCLAIMER_STYLE
+            )
+        }
+    return _static
 
 
-def generate_pdf(
+def _build(
+    target,
     overall_risk,
     total_clauses,
     contract_type="General Contract",
     language="English",
     risk_summary=None
 ):
+    # target is a file path or a binary file object
     if risk_summary is None:
-        risk_summary = {
-            "Penalty Clauses": True,
-            "Indemnity Clauses": True,
-            "Termination Risks": True,
-            "IP Ownership Risks": True,
-            "Arbitration / Jurisdiction": True
-        }
-
-    os.makedirs("pdf_reports", exist_ok=True)
-    file_path = f"pdf_reports/contract_risk_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        # Without clause results the areas are reported as not assessed
+        risk_summary = dict.fromkeys(PDF_RISK_AREAS)
 
     doc = SimpleDocTemplate(
-        file_path,
+        target,
         pagesize=A4,
         rightMargin=40,
         leftMargin=40,
@@ -34,155 +163,147 @@ def generate_pdf(
         bottomMargin=40
     )
 
-    styles = getSampleStyleSheet()
+    static = _static_flowables()
     elements = []
 
-    title_style = ParagraphStyle(
-        "TitleStyle",
-        fontSize=22,
-        textColor=colors.white,
-        alignment=1,
-        spaceAfter=20
-    )
-
-    header_bg = Table(
-        [[Paragraph("Contract Risk Assessment Summary", title_style)]],
-        colWidths=[480]
-    )
-    header_bg.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#0f172a")),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("PADDING", (0, 0), (-1, -1), 18)
-    ]))
-
-    elements.append(header_bg)
+    elements.append(static["header"])
     elements.append(Spacer(1, 20))
 
-    meta_style = ParagraphStyle(
-        "Meta",
-        fontSize=10,
-        textColor=colors.grey
-    )
-
     elements.append(Paragraph(
         f"Generated on: {datetime.now().strftime('%d %b %Y, %H:%M')}",
-        meta_style
+        META_STYLE
     ))
 
     elements.append(Spacer(1, 20))
 
-    section_style = ParagraphStyle(
-        "Section",
-        fontSize=14,
-        textColor=colors.HexColor("#0f172a"),
-        spaceAfter=10,
-        spaceBefore=20,
-        fontName="Helvetica-Bold"
-    )
-
-    body_style = ParagraphStyle(
-        "Body",
-        fontSize=11,
-        leading=16
-    )
-
-    elements.append(Paragraph("Contract Information", section_style))
+    elements.append(static["contract_info_title"])
     elements.append(Paragraph(
         f"""
         <b>Contract Type:</b> {contract_type}<br/>
         <b>Detected Language:</b> {language}<br/>
         <b>Total Clauses Analyzed:</b> {total_clauses}
         """,
-        body_style
+        BODY_STYLE
     ))
 
     elements.append(Spacer(1, 16))
 
-    risk_color = (
-        colors.red if overall_risk == "High Risk"
-        else colors.orange if overall_risk == "Medium Risk"
-        else colors.green
-    )
-
     risk_box = Table(
-        [[Paragraph(f"Overall Contract Risk Level: {overall_risk}", ParagraphStyle(
-            "Risk",
-            fontSize=14,
-            textColor=colors.white,
-            alignment=1,
-            fontName="Helvetica-Bold"
-        ))]],
+        [[Paragraph(f"Overall Contract Risk Level: {overall_risk}", RISK_STYLE)]],
         colWidths=[480]
     )
-
-    risk_box.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, -1), risk_color),
-        ("PADDING", (0, 0), (-1, -1), 14)
-    ]))
+    risk_box.setStyle(RISK_BOX_STYLES.get(overall_risk, RISK_BOX_STYLES["Low Risk"]))
 
     elements.append(risk_box)
 
     elements.append(Spacer(1, 20))
 
-    elements.append(Paragraph("Executive Summary", section_style))
-    elements.append(Paragraph(
-        """
-        This contract was automatically analyzed using an AI-assisted legal risk assessment engine
-        designed for small and medium businesses. The analysis identifies potential legal, financial,
-        and operational risks based on common contractual patterns.
-        <br/><br/>
-        The assessment highlights clauses related to penalties, termination rights, indemnities,
-        intellectual property ownership, and dispute resolution mechanisms. Business owners are
-        strongly advised to review high-risk clauses carefully and seek professional legal advice
-        before signing.
-        """,
-        body_style
-    ))
+    elements.append(static["summary_title"])
+    elements.append(static["summary"])
 
     elements.append(PageBreak())
 
-    elements.append(Paragraph("Key Risk Areas Detected", section_style))
+    elements.append(static["risk_areas_title"])
 
     risk_table_data = [["Risk Area", "Detected"]]
     for k, v in risk_summary.items():
-        risk_table_data.append([k, "Yes" if v else "No"])
+        risk_table_data.append([k, "Not assessed" if v is None else "Yes" if v else "No"])
 
     risk_table = Table(risk_table_data, colWidths=[300, 180])
-    risk_table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e5e7eb")),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("ALIGN", (1, 1), (-1, -1), "CENTER")
-    ]))
+    risk_table.setStyle(RISK_TABLE_STYLE)
 
     elements.append(risk_table)
 
     elements.append(PageBreak())
 
-    elements.append(Paragraph("Business Recommendations", section_style))
-    elements.append(Paragraph(
-        """
-        <b>Recommended Actions:</b><br/><br/>
-        • Review all high-risk clauses carefully before signing.<br/>
-        • Renegotiate one-sided termination, penalty, or indemnity clauses.<br/>
-        • Clarify intellectual property ownership and usage rights.<br/>
-        • Ensure dispute resolution and jurisdiction terms are acceptable.<br/><br/>
-        <b>Signing Guidance:</b><br/>
-        This report is intended to assist decision-making but should not replace professional
-        legal consultation for critical contracts.
-        """,
-        body_style
-    ))
+    elements.append(static["recommendations_title"])
+    elements.append(static["recommendations"])
 
     elements.append(Spacer(1, 30))
 
-    elements.append(Paragraph(
-        "<i>Disclaimer: This report is generated for informational purposes only and does not constitute legal advice.</i>",
-        ParagraphStyle("Disclaimer", fontSize=9, textColor=colors.grey)
-    ))
+    elements.append(static["disclaimer"])
+
+    with _build_lock:
+        doc.build(elements)
+
+
+def render_pdf(**report) -> bytes:
+    """
+    Renders the risk summary into memory and returns the PDF bytes.
+    Takes the same arguments as generate_pdf.
+    """
+    buffer = io.BytesIO()
+    _build(buffer, **report)
+    return buffer.getvalue()
+
+
+def prerender_pdf(**report):
+    """
+    Starts render_pdf in a background thread.
+    Returns a Future whose result is the PDF bytes.
+    """
+    return _executor.submit(render_pdf, **report)
+
+
+def cleanup_reports(directory=REPORT_DIR, max_age_days=None, max_files=None) -> int:
+    """
+    Deletes saved reports older than max_age_days and, beyond that, the
+    oldest reports over max_files. Returns the number of files removed.
+    """
+    if not os.path.isdir(directory):
+        return 0
+
+    reports = []
+    for name in os.listdir(directory):
+        if name.endswith(".pdf"):
+            path = os.path.join(directory, name)
+            reports.append((os.path.getmtime(path), path))
+    reports.sort()
+
+    expired = []
+    if max_age_days is not None:
+        cutoff = time.time() - max_age_days * 86400
+        expired = [path for mtime, path in reports if mtime < cutoff]
+        reports = [(mtime, path) for mtime, path in reports if mtime >= cutoff]
+    if max_files is not None and len(reports) > max_files:
+        expired += [path for _, path in reports[:len(reports) - max_files]]
+
+    removed = 0
+    for path in expired:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
 
-    doc.build(elements)
-    return file_path
 
+def generate_pdf(
+    overall_risk,
+    total_clauses,
+    contract_type="General Contract",
+    language="English",
+    risk_summary=None
+):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    file_path = f"{REPORT_DIR}/contract_risk_summary_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.pdf"
 
+    _build(
+        file_path,
+        overall_risk=overall_risk,
+        total_clauses=total_clauses,
+        contract_type=contract_type,
+        language=language,
+        risk_summary=risk_summary
+    )
 
+    # Optional retention for the reports directory
+    max_age = os.environ.get("PDF_REPORT_MAX_AGE_DAYS")
+    max_files = os.environ.get("PDF_REPORT_MAX_FILES")
+    if max_age or max_files:
+        cleanup_reports(
+            max_age_days=float(max_age) if max_age else None,
+            max_files=int(max_files) if max_files else None
+        )
+
+    return file_path
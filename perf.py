@@ -0,0 +1,315 @@
+# perf.py
+
+# Lightweight timing helpers
+# Used to track cold-start latency and per-stage analysis timings, and
+# optionally per-stage memory use
+
+import json
+import linecache
+import threading
+import time
+import tracemalloc
+
+
+# Reference point: the first import of this module, which app.py does first
+_START = time.perf_counter()
+_startup_marks = {}
+
+
+def mark_startup(name: str) -> float:
+    """
+    Records the first time a startup milestone is reached.
+    Returns milliseconds since startup; later calls keep the first value.
+    """
+    if name not in _startup_marks:
+        _startup_marks[name] = round((time.perf_counter() - _START) * 1000, 1)
+
+        # One line per milestone on stdout, for container log collection
+        print(f"startup {json.dumps({name: _startup_marks[name]})}", flush=True)
+
+    return _startup_marks[name]
+
+
+def startup_report() -> dict:
+    """
+    Returns startup milestones in the order they were reached (ms).
+    """
+    return dict(_startup_marks)
+
+
+# Memory profiling: stack depth kept per allocation and allocation
+# sites reported per root span
+MEMORY_FRAMES = 1
+MEMORY_TOP_SITES = 10
+
+# tracemalloc is process-wide: tracers share it, started by the first
+# and stopped with the last (unless something else had started it)
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started = False
+_tracemalloc_joins = 0
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_started, _tracemalloc_joins
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+            _tracemalloc_started = True
+        _tracemalloc_users += 1
+        _tracemalloc_joins += 1
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+
+
+def _traced_memory(reset_peak=False) -> tuple:
+    # (current, peak, shared, joins): the peak is only reset, and only
+    # attributable to one tracer, while no other tracer is running
+    with _tracemalloc_lock:
+        current, peak = tracemalloc.get_traced_memory()
+        shared = _tracemalloc_users > 1
+        if reset_peak and not shared:
+            tracemalloc.reset_peak()
+        return current, peak, shared, _tracemalloc_joins
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """
+    Raised when traced allocations exceed the tracer's memory budget.
+    stage is the innermost running span; sites are the largest live
+    allocation sites at that moment.
+    """
+
+    def __init__(self, stage: str, used_bytes: int, budget_bytes: int, sites: list):
+        self.stage = stage
+        self.used_bytes = used_bytes
+        self.budget_bytes = budget_bytes
+        self.sites = sites
+        super().__init__(
+            f"Memory budget of {budget_bytes / 2 ** 20:.1f} MB exceeded during {stage!r} "
+            f"({used_bytes / 2 ** 20:.1f} MB allocated)"
+        )
+
+
+def top_allocation_sites(snapshot, limit=MEMORY_TOP_SITES, baseline=None) -> list:
+    """
+    Largest allocation sites of a tracemalloc snapshot (growth against
+    baseline if given) as dicts with site, kb, count and line.
+    """
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+        tracemalloc.Filter(False, __file__)
+    ])
+    if baseline is not None:
+        stats = [s for s in snapshot.compare_to(baseline, "lineno") if s.size_diff > 0]
+        stats.sort(key=lambda s: s.size_diff, reverse=True)
+        sizes = [(s, s.size_diff, s.count_diff) for s in stats[:limit]]
+    else:
+        sizes = [(s, s.size, s.count) for s in snapshot.statistics("lineno")[:limit]]
+
+    sites = []
+    for stat, size, count in sizes:
+        frame = stat.traceback[0]
+        sites.append({
+            "site": f"{frame.filename}:{frame.lineno}",
+            "kb": round(size / 1024, 1),
+            "count": count,
+            "line": linecache.getline(frame.filename, frame.lineno).strip()
+        })
+    return sites
+
+
+# Nested timing spans for the analysis flow
+
+class Span:
+    """
+    One timed stage. Counts (pages, characters, clauses, ...) are attached
+    with set(); child spans are opened through the tracer while it is active.
+    """
+
+    __slots__ = ("name", "counts", "children", "started", "ms", "memory",
+                 "_memory_start", "_memory_peak", "_memory_shared", "_memory_joins", "_snapshot")
+
+    def __init__(self, name: str, counts: dict):
+        self.name = name
+        self.counts = counts
+        self.children = []
+        self.started = 0.0
+        self.ms = None
+        self.memory = None
+
+    def set(self, **counts):
+        self.counts.update(counts)
+
+    def to_dict(self) -> dict:
+        span = {
+            "name": self.name,
+            "ms": self.ms,
+            "counts": self.counts,
+            "children": [child.to_dict() for child in self.children]
+        }
+        if self.memory is not None:
+            span["memory"] = self.memory
+        return span
+
+
+class _NullSpan:
+    # Shared stand-in used when tracing is disabled
+
+    def set(self, **counts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Collects nested spans:
+
+        with tracer.span("extraction") as s:
+            ...
+            s.set(pages=12)
+
+    A disabled tracer hands out NULL_SPAN and records nothing.
+
+    memory=True also records tracemalloc peak and retained allocations
+    per span, and the allocation sites that grew most over each root
+    span; this slows the traced code down noticeably. With memory_budget_mb set,
+    span boundaries and check_memory() calls raise MemoryBudgetExceeded
+    once allocations since the root span started pass the budget.
+
+    tracemalloc counts every thread of the process: while several traced
+    analyses overlap, each one's numbers include the others' allocations
+    and its spans are marked "shared".
+    """
+
+    def __init__(self, enabled=True, memory=False, memory_budget_mb=None):
+        self.enabled = enabled
+        self.memory = memory or memory_budget_mb is not None
+        self.memory_budget = int(memory_budget_mb * 2 ** 20) if memory_budget_mb is not None else None
+        self.roots = []
+        self._stack = []
+
+    def span(self, name: str, **counts):
+        if not self.enabled and not self.memory:
+            return NULL_SPAN
+        return _ActiveSpan(self, Span(name, counts))
+
+    def check_memory(self):
+        """
+        Raises MemoryBudgetExceeded if allocations since the root span
+        started are over budget. Cheap enough to call once per page or clause.
+        """
+        if self.memory_budget is None or not self._stack:
+            return
+        root = self._stack[0]
+        current, _ = tracemalloc.get_traced_memory()
+        used = current - root._memory_start
+        if used > self.memory_budget:
+            sites = top_allocation_sites(tracemalloc.take_snapshot(), baseline=root._snapshot)
+            raise MemoryBudgetExceeded(self._stack[-1].name, used, self.memory_budget, sites)
+
+    def _memory_enter(self, span: Span):
+        if not self._stack:
+            _acquire_tracemalloc()
+
+        # Taken before the starting point is read, so holding the baseline
+        # does not count against the span
+        span._snapshot = tracemalloc.take_snapshot() if not self._stack else None
+
+        # Open spans keep the peak seen so far, then the peak is reset so
+        # this span measures only its own
+        current, peak, shared, joins = _traced_memory(reset_peak=True)
+        for parent in self._stack:
+            parent._memory_peak = max(parent._memory_peak, peak)
+
+        span._memory_start = current
+        span._memory_peak = current
+        span._memory_shared = shared
+        span._memory_joins = joins
+
+    def _memory_exit(self, span: Span):
+        current, peak, shared, joins = _traced_memory()
+        span._memory_peak = max(span._memory_peak, peak)
+        for parent in self._stack:
+            parent._memory_peak = max(parent._memory_peak, span._memory_peak)
+
+        span.memory = {
+            "peak_kb": round((span._memory_peak - span._memory_start) / 1024, 1),
+            "retained_kb": round((current - span._memory_start) / 1024, 1)
+        }
+        # Another tracer ran at some point during the span
+        if span._memory_shared or shared or joins != span._memory_joins:
+            span.memory["shared"] = True
+            for parent in self._stack:
+                parent._memory_shared = True
+        if span._snapshot is not None:
+            span.memory["top_sites"] = top_allocation_sites(tracemalloc.take_snapshot(), baseline=span._snapshot)
+            span._snapshot = None
+
+        if not self._stack:
+            _release_tracemalloc()
+
+    def to_list(self) -> list:
+        return [span.to_dict() for span in self.roots]
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "span")
+
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        tracer = self.tracer
+        if tracer.memory:
+            tracer._memory_enter(self.span)
+
+        stack = tracer._stack
+        (stack[-1].children if stack else tracer.roots).append(self.span)
+        stack.append(self.span)
+        self.span.started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, *exc):
+        self.span.ms = round((time.perf_counter() - self.span.started) * 1000, 2)
+        try:
+            # Checked while the span is still open, so errors name this stage
+            if self.tracer.memory and exc_type is None:
+                self.tracer.check_memory()
+        finally:
+            self.tracer._stack.pop()
+            if self.tracer.memory:
+                self.tracer._memory_exit(self.span)
+        return False
+
+
+NULL_TRACER = Tracer(enabled=False)
+
+
+def flatten_spans(spans: list, depth=0) -> list:
+    """
+    Flattens span dicts into rows for display:
+    (depth, name, ms, counts, memory or None).
+    """
+    rows = []
+    for span in spans:
+        rows.append((depth, span["name"], span["ms"], span["counts"], span.get("memory")))
+        rows.extend(flatten_spans(span["children"], depth + 1))
+    return rows
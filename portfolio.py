@@ -0,0 +1,227 @@
+# portfolio.py
+
+# Vectorized risk scoring across many contracts
+# Clause results are packed into flat integer arrays with per-contract
+# offsets, so a whole portfolio is scored in a few NumPy passes
+#
+# Usage:
+#   python batch_analyze.py contracts/ -o results.jsonl
+#   python portfolio.py results.jsonl
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from risk_engine import RISK_PATTERNS, RISK_SCORES
+
+
+# Clause risk codes are the contract_risk_score weights (0 is unused)
+RISK_CODES = dict(RISK_SCORES)
+RISK_NAMES = {code: level for level, code in RISK_CODES.items()}
+
+# Overall contract codes; NOT_SCORED marks contracts without clauses
+NOT_SCORED = 0
+OVERALL_NAMES = {NOT_SCORED: "Not Scored", 1: "Low Risk", 2: "Medium Risk", 3: "High Risk"}
+
+# Known clause types get stable codes; others are added as they are seen
+BASE_TYPES = list(RISK_PATTERNS) + ["General"]
+
+
+class Portfolio:
+    """
+    Clause risk levels and types of many contracts as flat arrays.
+
+    risk[offsets[i]:offsets[i + 1]] are the clause risk codes of contract i;
+    type_codes[type_offsets[i]:type_offsets[i + 1]] are the type codes of
+    all its clauses (one entry per clause and type).
+    """
+
+    __slots__ = ("names", "type_names", "risk", "offsets", "type_codes", "type_offsets")
+
+    def __init__(self, names, type_names, risk, offsets, type_codes, type_offsets):
+        self.names = names
+        self.type_names = type_names
+        self.risk = risk
+        self.offsets = offsets
+        self.type_codes = type_codes
+        self.type_offsets = type_offsets
+
+    def __len__(self):
+        return len(self.names)
+
+    def contract_index(self, offsets) -> np.ndarray:
+        # Contract number of every element of a flat array with these offsets
+        return np.repeat(np.arange(len(self.names)), np.diff(offsets))
+
+
+def encode_portfolio(contracts) -> Portfolio:
+    """
+    Packs an iterable of (name, record) pairs into a Portfolio.
+
+    A record is an analysis result or a batch_analyze JSONL record: its
+    "clauses" (with "risk" and "types") are used when present, otherwise
+    its "risk_levels" or "risk_counts" (--summary-only records, no types).
+    """
+    names = []
+    type_names = list(BASE_TYPES)
+    type_lookup = {name: code for code, name in enumerate(type_names)}
+
+    risk = []
+    offsets = [0]
+    type_codes = []
+    type_offsets = [0]
+
+    for name, record in contracts:
+        names.append(name)
+
+        if "clauses" in record:
+            for clause in record["clauses"]:
+                risk.append(RISK_CODES[clause["risk"]])
+                for clause_type in clause["types"]:
+                    code = type_lookup.get(clause_type)
+                    if code is None:
+                        code = type_lookup[clause_type] = len(type_names)
+                        type_names.append(clause_type)
+                    type_codes.append(code)
+        elif "risk_levels" in record:
+            risk.extend(RISK_CODES[level] for level in record["risk_levels"])
+        else:
+            # Clause order does not matter for scoring
+            for level, count in record["risk_counts"].items():
+                risk.extend([RISK_CODES[level]] * count)
+
+        offsets.append(len(risk))
+        type_offsets.append(len(type_codes))
+
+    return Portfolio(
+        names,
+        type_names,
+        np.array(risk, dtype=np.int8),
+        np.array(offsets, dtype=np.int64),
+        np.array(type_codes, dtype=np.int16),
+        np.array(type_offsets, dtype=np.int64)
+    )
+
+
+def risk_counts(portfolio: Portfolio) -> np.ndarray:
+    """
+    Clauses per risk code for every contract, shape (contracts, 4).
+    """
+    n = len(portfolio)
+    owners = portfolio.contract_index(portfolio.offsets)
+    counts = np.bincount(owners * 4 + portfolio.risk, minlength=n * 4)
+    return counts.reshape(n, 4)
+
+
+def type_counts(portfolio: Portfolio) -> np.ndarray:
+    """
+    Clauses per type for every contract, shape (contracts, types).
+    """
+    n, m = len(portfolio), len(portfolio.type_names)
+    owners = portfolio.contract_index(portfolio.type_offsets)
+    counts = np.bincount(owners * m + portfolio.type_codes, minlength=n * m)
+    return counts.reshape(n, m)
+
+
+def score_portfolio(portfolio: Portfolio) -> np.ndarray:
+    """
+    Overall risk code of every contract, with the same override logic as
+    contract_risk_score. Contracts without clauses get NOT_SCORED.
+    """
+    counts = risk_counts(portfolio)
+    high = counts[:, RISK_CODES["High"]]
+    total = counts[:, 1:].sum(axis=1)
+
+    # Integer sums divided once, as in contract_risk_score, so the
+    # threshold comparisons see exactly the same floats
+    weighted = counts[:, 1:] @ np.arange(1, 4)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_score = weighted / total
+
+    overall = np.select(
+        [total == 0, high >= 2, high == 1, avg_score >= 2.3, avg_score >= 1.5],
+        [NOT_SCORED, 3, 2, 3, 2],
+        default=1
+    )
+    return overall.astype(np.int8)
+
+
+def portfolio_summary(portfolio: Portfolio) -> dict:
+    """
+    Portfolio-wide exposure and distribution statistics.
+    """
+    counts = risk_counts(portfolio)
+    overall = score_portfolio(portfolio)
+    types = type_counts(portfolio)
+    clauses = counts.sum(axis=1)
+    scored = clauses > 0
+
+    high_share = counts[scored, RISK_CODES["High"]] / clauses[scored]
+
+    return {
+        "contracts": len(portfolio),
+        "clauses": int(clauses.sum()),
+        "overall_risk": {
+            OVERALL_NAMES[code]: int(count)
+            for code, count in enumerate(np.bincount(overall, minlength=4))
+        },
+        "clause_risk": {
+            RISK_NAMES[code]: int(counts[:, code].sum()) for code in (3, 2, 1)
+        },
+        "category_exposure": {
+            name: {
+                "clauses": int(types[:, code].sum()),
+                "contracts": int((types[:, code] > 0).sum())
+            }
+            for code, name in enumerate(portfolio.type_names)
+            if types[:, code].any()
+        },
+        "clauses_per_contract": {
+            "mean": round(float(clauses.mean()), 2) if len(portfolio) else 0.0,
+            "max": int(clauses.max()) if len(portfolio) else 0
+        },
+        "high_risk_share": {
+            "mean": round(float(high_share.mean()), 4) if high_share.size else 0.0,
+            "p50": round(float(np.percentile(high_share, 50)), 4) if high_share.size else 0.0,
+            "p90": round(float(np.percentile(high_share, 90)), 4) if high_share.size else 0.0
+        }
+    }
+
+
+def read_jsonl(path: str):
+    """
+    Yields (path, record) pairs from batch_analyze output, skipping
+    records of files that failed to analyze.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if "error" not in record:
+                    yield record["path"], record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score a portfolio of batch_analyze results and print exposure statistics."
+    )
+    parser.add_argument("results", help="JSONL file written by batch_analyze.py")
+    parser.add_argument("--contracts", action="store_true", help="Also list the overall risk of every contract")
+    args = parser.parse_args(argv)
+
+    portfolio = encode_portfolio(read_jsonl(args.results))
+    report = portfolio_summary(portfolio)
+    if args.contracts:
+        report["contract_risk"] = dict(zip(
+            portfolio.names,
+            (OVERALL_NAMES[code] for code in score_portfolio(portfolio).tolist())
+        ))
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,489 @@
+# portfolio_report.py
+
+# Portfolio PDF report for many analyzed contracts
+# Contracts are reduced to small section records as they stream in,
+# sections are rendered in chunks (optionally in worker processes) and
+# the chunk PDFs are merged behind the summary pages
+#
+# Usage:
+#   python batch_analyze.py contracts/ -o results.jsonl
+#   python portfolio_report.py results.jsonl -o portfolio_report.pdf --workers 4
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+
+from pdf_export import (
+    REPORT_DIR, TITLE_STYLE, META_STYLE, SECTION_STYLE, BODY_STYLE, DISCLAIMER_STYLE,
+    HEADER_TABLE_STYLE, RISK_TABLE_STYLE
+)
+from portfolio import read_jsonl
+from risk_engine import contract_risk_score_from_counts
+
+
+# Contracts per rendered chunk: one chunk of sections is in memory (and
+# in flight per worker) at a time
+SECTION_CONTRACTS = 200
+
+# Flagged clause excerpts per contract, and their length
+MAX_EXCERPTS = 5
+EXCERPT_CHARS = 400
+
+# Summary table rows per table; short tables keep reportlab's table
+# splitting cheap for thousands of contracts
+SUMMARY_ROWS_PER_TABLE = 40
+
+# Summary table rows per rendered summary chunk
+SUMMARY_CONTRACTS = 1000
+
+# Flowables buffered ahead of the layout engine (keep-with-next lookahead)
+FLOWABLE_LOOKAHEAD = 16
+
+RISK_LEVELS = ("High", "Medium", "Low")
+
+CONTRACT_TITLE_STYLE = ParagraphStyle(
+    "ContractTitle",
+    parent=SECTION_STYLE,
+    fontSize=12,
+    spaceBefore=14,
+    spaceAfter=6,
+    keepWithNext=True
+)
+
+EXCERPT_STYLE = ParagraphStyle(
+    "Excerpt",
+    fontSize=9,
+    leading=12,
+    leftIndent=12,
+    spaceAfter=6,
+    textColor=colors.HexColor("#334155")
+)
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e5e7eb")),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("ALIGN", (3, 1), (-1, -1), "CENTER")
+])
+
+
+class FlowableStream(list):
+    """
+    A story for SimpleDocTemplate.build that pulls flowables from an
+    iterator as the layout engine consumes them, so only a few are alive
+    at a time. build() only uses len(), indexing, deletion and insertion
+    at the front, which work on the buffered part of the list.
+    """
+
+    def __init__(self, flowables, lookahead=FLOWABLE_LOOKAHEAD):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def _fill(self, count: int):
+        while self._source is not None and list.__len__(self) < count:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill(self._lookahead)
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, int) and index >= 0:
+            self._fill(index + 1)
+        return list.__getitem__(self, index)
+
+
+def _document(target) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
+        target,
+        pagesize=A4,
+        rightMargin=40,
+        leftMargin=40,
+        topMargin=40,
+        bottomMargin=40
+    )
+
+
+def _clause_text(record: dict, clause: dict):
+    # Batch records carry clause text; analysis results index their full text
+    if "text" in clause:
+        return clause["text"]
+    if record.get("text"):
+        return record["text"][clause["start"]:clause["end"]]
+    return None
+
+
+def contract_section(name: str, record: dict) -> dict:
+    """
+    Reduces an analysis result or batch_analyze record to what its report
+    section shows: overall risk, clause counts per level and type, and
+    excerpts of the flagged (High, then Medium) clauses.
+    """
+    clauses = record.get("clauses")
+    type_counts = {}
+    flagged = {"High": [], "Medium": []}
+
+    if clauses is not None:
+        counts = dict.fromkeys(RISK_LEVELS, 0)
+        for clause in clauses:
+            counts[clause["risk"]] += 1
+            for clause_type in clause["types"]:
+                type_counts[clause_type] = type_counts.get(clause_type, 0) + 1
+            if clause["risk"] in flagged and len(flagged[clause["risk"]]) < MAX_EXCERPTS:
+                text = _clause_text(record, clause)
+                flagged[clause["risk"]].append({
+                    "id": clause["id"],
+                    "number": clause["number"],
+                    "risk": clause["risk"],
+                    "types": clause["types"],
+                    "excerpt": _excerpt(text) if text is not None else None
+                })
+    elif "risk_levels" in record:
+        counts = {level: record["risk_levels"].count(level) for level in RISK_LEVELS}
+    else:
+        counts = {level: record.get("risk_counts", {}).get(level, 0) for level in RISK_LEVELS}
+
+    overall_risk = record.get("overall_risk")
+    if overall_risk is None:
+        overall_risk = contract_risk_score_from_counts(counts)
+
+    contract_type = record.get("contract_type")
+    if isinstance(contract_type, dict):
+        contract_type = contract_type["type"]
+
+    return {
+        "name": name,
+        "contract_type": contract_type,
+        "overall_risk": overall_risk,
+        "risk_counts": counts,
+        "type_counts": type_counts,
+        "excerpts": (flagged["High"] + flagged["Medium"])[:MAX_EXCERPTS]
+    }
+
+
+def _excerpt(text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) > EXCERPT_CHARS:
+        text = text[:EXCERPT_CHARS].rsplit(" ", 1)[0] + " ..."
+    return text
+
+
+class PortfolioTotals:
+    """
+    The portfolio overview figures of portfolio.portfolio_summary,
+    accumulated one contract section at a time.
+    """
+
+    def __init__(self):
+        self.contracts = 0
+        self.clause_risk = dict.fromkeys(RISK_LEVELS, 0)
+        self.overall_risk = dict.fromkeys(("Not Scored", "Low Risk", "Medium Risk", "High Risk"), 0)
+        self.exposure = {}
+        self._high_share_sum = 0.0
+        self._scored = 0
+
+    def add(self, section: dict):
+        counts = section["risk_counts"]
+        clauses = sum(counts.values())
+        self.contracts += 1
+        for level in RISK_LEVELS:
+            self.clause_risk[level] += counts[level]
+
+        self.overall_risk[contract_risk_score_from_counts(counts)] += 1
+        if clauses:
+            self._high_share_sum += counts["High"] / clauses
+            self._scored += 1
+
+        for clause_type, count in section["type_counts"].items():
+            contracts, type_clauses = self.exposure.get(clause_type, (0, 0))
+            self.exposure[clause_type] = (contracts + 1, type_clauses + count)
+
+    @property
+    def clauses(self) -> int:
+        return sum(self.clause_risk.values())
+
+    @property
+    def high_risk_share(self) -> float:
+        return self._high_share_sum / self._scored if self._scored else 0.0
+
+
+def _section_flowables(section: dict, number: int, last: bool = False):
+    yield Paragraph(f"{number}. {escape(section['name'])}", CONTRACT_TITLE_STYLE)
+
+    counts = section["risk_counts"]
+    yield Paragraph(
+        f"<b>Contract Type:</b> {escape(section['contract_type'] or 'Not classified')}<br/>"
+        f"<b>Overall Risk:</b> {section['overall_risk']}<br/>"
+        f"<b>Clauses Analyzed:</b> {sum(counts.values())}",
+        BODY_STYLE
+    )
+
+    breakdown = [["Risk Level / Clause Type", "Clauses"]] + [[level, counts[level]] for level in RISK_LEVELS]
+    flagged_types = sorted(
+        (item for item in section["type_counts"].items() if item[0] != "General"),
+        key=lambda item: -item[1]
+    )
+    if flagged_types:
+        breakdown += [[clause_type, count] for clause_type, count in flagged_types]
+    table = Table(breakdown, colWidths=[300, 180])
+    table.setStyle(RISK_TABLE_STYLE)
+    yield Spacer(1, 6)
+    yield table
+
+    for excerpt in section["excerpts"]:
+        label = f"Clause {excerpt['number'] or excerpt['id']} ({excerpt['risk']}; {', '.join(excerpt['types'])})"
+        text = escape(excerpt["excerpt"]) if excerpt["excerpt"] is not None else "<i>Text not included in results</i>"
+        yield Paragraph(f"<b>{escape(label)}:</b> {text}", EXCERPT_STYLE)
+
+    # A trailing spacer that falls past the last page would add a blank one
+    if not last:
+        yield Spacer(1, 12)
+
+
+def render_sections(sections: list, path: str, first_number: int = 1) -> str:
+    """
+    Renders per-contract sections (contract_section dicts) into a PDF at
+    path, numbering them from first_number. Returns path.
+    """
+    def story():
+        if first_number == 1:
+            yield Paragraph("Contract Details", SECTION_STYLE)
+        for offset, section in enumerate(sections):
+            yield from _section_flowables(section, first_number + offset, last=offset == len(sections) - 1)
+
+    _document(path).build(FlowableStream(story()))
+    return path
+
+
+def _summary_row(section: dict) -> list:
+    counts = section["risk_counts"]
+    return [
+        section["name"], section["contract_type"], section["overall_risk"],
+        counts["High"], counts["Medium"], counts["Low"]
+    ]
+
+
+def _summary_flowables(totals: PortfolioTotals, rows: list, title: str, first_number: int, last: bool):
+    if first_number == 1:
+        header = Table([[Paragraph(escape(title), TITLE_STYLE)]], colWidths=[480])
+        header.setStyle(HEADER_TABLE_STYLE)
+        yield header
+        yield Spacer(1, 20)
+        yield Paragraph(f"Generated on: {datetime.now().strftime('%d %b %Y, %H:%M')}", META_STYLE)
+        yield Spacer(1, 20)
+
+        yield Paragraph("Portfolio Overview", SECTION_STYLE)
+        overview = [["Measure", "Value"], ["Contracts", totals.contracts], ["Clauses", totals.clauses]]
+        overview += [[f"Contracts: {risk}", count] for risk, count in totals.overall_risk.items() if count]
+        overview += [[f"Clauses: {level} risk", count] for level, count in totals.clause_risk.items()]
+        overview.append(["Mean share of high-risk clauses", f"{totals.high_risk_share:.1%}"])
+        table = Table(overview, colWidths=[300, 180])
+        table.setStyle(RISK_TABLE_STYLE)
+        yield table
+
+        if totals.exposure:
+            yield Paragraph("Category Exposure", SECTION_STYLE)
+            exposure = [["Clause Type", "Contracts", "Clauses"]] + [
+                [clause_type, contracts, clauses]
+                for clause_type, (contracts, clauses) in sorted(totals.exposure.items(), key=lambda item: -item[1][0])
+            ]
+            table = Table(exposure, colWidths=[240, 120, 120])
+            table.setStyle(RISK_TABLE_STYLE)
+            yield table
+
+        yield PageBreak()
+        yield Paragraph("Contract Summary", SECTION_STYLE)
+
+    columns = ["#", "Contract", "Type", "Overall Risk", "High", "Medium", "Low"]
+    for start in range(0, len(rows), SUMMARY_ROWS_PER_TABLE):
+        table_rows = [columns]
+        for number, (name, contract_type, overall_risk, high, medium, low) in enumerate(
+            rows[start:start + SUMMARY_ROWS_PER_TABLE], first_number + start
+        ):
+            table_rows.append([
+                number,
+                Paragraph(escape(name if len(name) <= 60 else "..." + name[-57:]), EXCERPT_STYLE),
+                contract_type or "-",
+                overall_risk,
+                high, medium, low
+            ])
+        table = Table(table_rows, colWidths=[30, 170, 90, 70, 40, 40, 40], repeatRows=1)
+        table.setStyle(SUMMARY_TABLE_STYLE)
+        yield table
+
+    if last:
+        yield Spacer(1, 20)
+        yield Paragraph(
+            "<i>Disclaimer: This report is generated for informational purposes only and does not constitute legal advice.</i>",
+            DISCLAIMER_STYLE
+        )
+
+
+def render_summary(totals: PortfolioTotals, rows: list, path: str, first_number: int = 1, last: bool = True,
+                   title="Contract Portfolio Risk Report") -> str:
+    """
+    Renders one chunk of the per-contract summary table (_summary_row
+    lists, numbered from first_number). The first chunk opens with the
+    title and portfolio overview, the last ends with the disclaimer.
+    """
+    _document(path).build(FlowableStream(_summary_flowables(totals, rows, title, first_number, last)))
+    return path
+
+
+def _chunks(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _render_section_chunks(sections, workdir: str, workers: int, section_contracts: int) -> list:
+    parts = []
+    chunks = enumerate(_chunks(sections, section_contracts))
+
+    if workers <= 1:
+        for index, chunk in chunks:
+            parts.append(render_sections(
+                chunk, os.path.join(workdir, f"sections_{index:05d}.pdf"), index * section_contracts + 1
+            ))
+        return parts
+
+    # spawn: forking a threaded server process (Streamlit) is unsafe.
+    # A bounded number of chunks is in flight at a time
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = []
+        in_flight = set()
+        for index, chunk in chunks:
+            future = pool.submit(
+                render_sections,
+                chunk, os.path.join(workdir, f"sections_{index:05d}.pdf"), index * section_contracts + 1
+            )
+            futures.append(future)
+            in_flight.add(future)
+            if len(in_flight) >= workers * 2:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        return [future.result() for future in futures]
+
+
+def _render_summary_chunks(totals: PortfolioTotals, rows_path: str, workdir: str) -> list:
+    # One chunk of rows is read ahead, so the last chunk is known to be
+    # last when it is rendered
+    paths = []
+    with open(rows_path, encoding="utf-8") as f:
+        chunks = _chunks((json.loads(line) for line in f), SUMMARY_CONTRACTS)
+        chunk = next(chunks, [])
+        index = 0
+        while chunk is not None:
+            following = next(chunks, None)
+            paths.append(render_summary(
+                totals, chunk, os.path.join(workdir, f"summary_{index:05d}.pdf"),
+                first_number=index * SUMMARY_CONTRACTS + 1, last=following is None
+            ))
+            chunk = following
+            index += 1
+    return paths
+
+
+def _merge_pdfs(paths: list, output: str):
+    # qpdf copies the parts' objects straight through to the output; PyPDF2
+    # (always available) builds the whole merged document in memory first
+    qpdf = shutil.which("qpdf")
+    if qpdf:
+        result = subprocess.run(
+            [qpdf, "--empty", "--pages", *paths, "--", os.path.abspath(output)],
+            capture_output=True, text=True
+        )
+        # Exit status 3 means written with warnings
+        if result.returncode not in (0, 3):
+            raise RuntimeError(f"qpdf could not merge the report: {result.stderr.strip()}")
+        return
+
+    from PyPDF2 import PdfWriter
+
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    with open(output, "wb") as f:
+        writer.write(f)
+    writer.close()
+
+
+def generate_portfolio_pdf(contracts, output: str = None, workers: int = 1,
+                           section_contracts: int = SECTION_CONTRACTS) -> str:
+    """
+    Builds one report for an iterable of (name, record) pairs (analysis
+    results or batch_analyze records, as read by portfolio.read_jsonl).
+
+    The iterable is read once. Each contract is reduced to its section
+    as it arrives and sections are rendered SECTION_CONTRACTS at a time
+    (with workers > 1, in worker processes); summary rows go to a scratch
+    file and are rendered SUMMARY_CONTRACTS at a time. The parts are
+    merged with qpdf when it is installed, which streams them; PyPDF2,
+    the fallback, holds the merged document in memory. Returns the
+    output path.
+    """
+    if output is None:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        output = f"{REPORT_DIR}/portfolio_report_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.pdf"
+
+    totals = PortfolioTotals()
+
+    with tempfile.TemporaryDirectory(prefix="portfolio_report_") as workdir:
+        rows_path = os.path.join(workdir, "summary_rows.jsonl")
+        with open(rows_path, "w", encoding="utf-8") as rows_file:
+            def sections():
+                for name, record in contracts:
+                    section = contract_section(name, record)
+                    totals.add(section)
+                    rows_file.write(json.dumps(_summary_row(section), ensure_ascii=False) + "\n")
+                    yield section
+
+            parts = _render_section_chunks(sections(), workdir, workers, section_contracts)
+
+        summary_parts = _render_summary_chunks(totals, rows_path, workdir)
+        _merge_pdfs(summary_parts + parts, output)
+
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render a portfolio PDF report from batch_analyze results."
+    )
+    parser.add_argument("results", help="JSONL file written by batch_analyze.py")
+    parser.add_argument("-o", "--output", help="Output PDF (default: pdf_reports/portfolio_report_<time>.pdf)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes rendering contract sections")
+    args = parser.parse_args(argv)
+
+    path = generate_portfolio_pdf(read_jsonl(args.results), args.output, workers=args.workers)
+    print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
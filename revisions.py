@@ -0,0 +1,158 @@
+# revisions.py
+
+# Clause alignment between two versions of the same contract
+# Lets a redlined upload reuse the analysis of its unchanged clauses
+
+import hashlib
+
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+INSERTED = "inserted"
+REMOVED = "removed"
+
+
+def clause_fingerprint(text: str) -> str:
+    """
+    Content hash of a clause's exact text. Whitespace counts: keyword
+    matches can span line breaks differently, so a reflowed clause is
+    rescanned rather than reused.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class UnchangedMatcher:
+    """
+    Pairs new clauses, fed in document order as (fingerprint, heading,
+    number), with old clauses of identical content the way align_clauses
+    does. Lets a clause stream reuse old analyses without the full new list.
+    """
+
+    def __init__(self, old):
+        self.old = old
+        self.used = set()
+        self._by_fingerprint = {}
+        for idx, (fingerprint, _, _) in enumerate(old):
+            self._by_fingerprint.setdefault(fingerprint, []).append(idx)
+
+    def match(self, fingerprint: str, heading, number):
+        """
+        Old index of the UNCHANGED clause for this new one, or None.
+        Renumbered clauses still count as unchanged, but a candidate with
+        the same number wins when content repeats.
+        """
+        candidates = [idx for idx in self._by_fingerprint.get(fingerprint, ()) if idx not in self.used]
+        if not candidates:
+            return None
+        same_number = [idx for idx in candidates if self.old[idx][1:] == (heading, number)]
+        idx = (same_number or candidates)[0]
+        self.used.add(idx)
+        return idx
+
+
+def align_clauses(old, new) -> tuple:
+    """
+    Aligns two clause lists, each given as (fingerprint, heading, number)
+    tuples in document order.
+
+    Returns (matches, removed): matches[i] is (status, old_index) for new
+    clause i, with status UNCHANGED (same content), CHANGED (same clause
+    number, new content) or INSERTED (old_index None); removed lists the
+    old indexes no new clause was matched to.
+    """
+    by_number = {}
+    for idx, (_, heading, number) in enumerate(old):
+        if number is not None:
+            by_number.setdefault((heading, number), []).append(idx)
+
+    # Identical content first
+    unchanged = UnchangedMatcher(old)
+    used = unchanged.used
+    matches = [None] * len(new)
+    for i, key in enumerate(new):
+        idx = unchanged.match(*key)
+        if idx is not None:
+            matches[i] = (UNCHANGED, idx)
+
+    # Then edits in place: same heading and number, different content
+    for i, (fingerprint, heading, number) in enumerate(new):
+        if matches[i] is not None:
+            continue
+        candidates = [idx for idx in by_number.get((heading, number), ()) if idx not in used]
+        if number is not None and candidates:
+            used.add(candidates[0])
+            matches[i] = (CHANGED, candidates[0])
+        else:
+            matches[i] = (INSERTED, None)
+
+    removed = [idx for idx in range(len(old)) if idx not in used]
+    return matches, removed
+
+
+def clause_keys(result: dict) -> list:
+    """
+    (fingerprint, heading, number) of every clause of an analysis result.
+    Results without text (stored templates) carry them precomputed.
+    """
+    if "clause_keys" in result:
+        return result["clause_keys"]
+
+    from analysis import clause_text
+
+    return [
+        (clause_fingerprint(clause_text(result, clause)), clause["heading"], clause["number"])
+        for clause in result["clauses"]
+    ]
+
+
+def compare_results(previous: dict, current: dict) -> dict:
+    """
+    Risk delta between two analysis results of the same contract.
+    Returns the overall risk before and after, per-level clause count
+    changes, and one row per changed, inserted or removed clause.
+    """
+    matches, removed = align_clauses(clause_keys(previous), clause_keys(current))
+    old_clauses = previous["clauses"]
+
+    counts = {UNCHANGED: 0, CHANGED: 0, INSERTED: 0, REMOVED: len(removed)}
+    changes = []
+    for clause, (status, old_idx) in zip(current["clauses"], matches):
+        counts[status] += 1
+        old = old_clauses[old_idx] if old_idx is not None else None
+
+        # Unchanged clauses only show up when their risk moved (rule updates)
+        if status == UNCHANGED and old["risk"] == clause["risk"]:
+            continue
+        changes.append({
+            "status": status,
+            "id": clause["id"],
+            "previous_id": old["id"] if old else None,
+            "number": clause["number"],
+            "previous_risk": old["risk"] if old else None,
+            "risk": clause["risk"],
+            "types": clause["types"]
+        })
+
+    for old_idx in removed:
+        old = old_clauses[old_idx]
+        changes.append({
+            "status": REMOVED,
+            "id": None,
+            "previous_id": old["id"],
+            "number": old["number"],
+            "previous_risk": old["risk"],
+            "risk": None,
+            "types": old["types"]
+        })
+
+    levels = ("High", "Medium", "Low")
+    return {
+        "previous_overall_risk": previous["overall_risk"],
+        "overall_risk": current["overall_risk"],
+        "counts": counts,
+        "risk_deltas": {
+            level: current["risk_levels"].count(level) - previous["risk_levels"].count(level)
+            for level in levels
+        },
+        "changes": changes
+    }
@@ -3,6 +3,9 @@
 # Rule-based legal risk assessment engine
 # Designed for explainability and SME use cases
 
+import hashlib
+import re
+
 
 # Clause patterns mapped to legal risk categories
 RISK_PATTERNS = {
@@ -36,37 +39,247 @@ RISK_PATTERNS = {
 }
 
 
-# Detect which legal clause types are present
+# Hindi keywords for the same categories
+# Used for clauses tagged "hi" in mixed English/Hindi contracts
+HINDI_RISK_PATTERNS = {
+    "Penalty Clause": [
+        "जुर्माना", "दंड", "परिनिर्धारित नुकसानी"
+    ],
+    "Indemnity Clause": [
+        "क्षतिपूर्ति", "हानिरहित"
+    ],
+    "Unilateral Termination": [
+        "किसी भी समय समाप्त", "बिना कारण समाप्त",
+        "बिना सूचना", "तत्काल समाप्ति"
+    ],
+    "Arbitration & Jurisdiction": [
+        "मध्यस्थता", "माध्यस्थम्", "क्षेत्राधिकार",
+        "शासी कानून", "न्यायालय"
+    ],
+    "Auto-Renewal": [
+        "स्वतः नवीनीकरण", "स्वचालित रूप से नवीनीकृत"
+    ],
+    "Lock-in Period": [
+        "लॉक-इन", "न्यूनतम अवधि"
+    ],
+    "Non-Compete": [
+        "गैर-प्रतिस्पर्धा", "प्रतिस्पर्धा नहीं", "प्रतिबंधित"
+    ],
+    "IP Transfer": [
+        "बौद्धिक संपदा", "आईपी स्वामित्व",
+        "सभी अधिकार सौंप"
+    ]
+}
 
-def detect_clause_types(clause: str) -> list:
-    clause_lower = clause.lower()
-    detected = []
+# Extra keyword tables per clause language, added on top of RISK_PATTERNS
+# (Hindi contracts often keep English legal terms)
+LANGUAGE_RISK_PATTERNS = {
+    "hi": HINDI_RISK_PATTERNS
+}
+
+
+# High-risk clause types for SMEs
+HIGH_RISK_TYPES = {
+    "Penalty Clause",
+    "Indemnity Clause",
+    "Unilateral Termination",
+    "Non-Compete",
+    "IP Transfer"
+}
+
+
+# Compiled single-pass keyword matcher
+# Built once per pattern table and rebuilt when the table's contents
+# change; scan many clauses through clause_scanner() to check once
+
+class ClauseMatcher:
+    """
+    Finds every keyword of a pattern table in one regex pass.
+
+    Keywords are tried longest-first at each position, so any other
+    keyword starting at the same position is a prefix of the match.
+    Those prefixes are resolved when the matcher is built, which keeps
+    the detected types identical to a substring check per keyword.
+    Match spans always index the clause as given, also when lowercasing
+    would change its length.
+    """
+
+    def __init__(self, patterns: dict, signature: tuple):
+        self.signature = signature
+        self.type_order = {clause_type: i for i, clause_type in enumerate(patterns)}
+
+        keyword_types = []
+        for clause_type, keywords in patterns.items():
+            for keyword in keywords:
+                if keyword:
+                    keyword_types.append((keyword, clause_type))
+
+        # keyword -> [(clause_type, keyword_length), ...] implied by a match
+        self.implied = {}
+        for keyword, _ in keyword_types:
+            hits = self.implied.setdefault(keyword, [])
+            for other, other_type in keyword_types:
+                hit = (other_type, len(other))
+                if keyword.startswith(other) and hit not in hits:
+                    hits.append(hit)
+
+        self.alternatives = sorted(self.implied, key=len, reverse=True)
+        pattern = "(?=(" + "|".join(re.escape(k) for k in self.alternatives) + "))"
+        self.regex = re.compile(pattern) if self.alternatives else None
+
+        # For the rare clauses whose lowercase form has another length
+        # (e.g. "İ"), where positions in clause.lower() would be shifted.
+        # Case-insensitive matches can differ from the keyword ("ſ" matches
+        # "s"), so each alternative is its own group and the group number
+        # tells which keyword matched
+        self.regex_ignorecase = re.compile(
+            "(?=" + "|".join(f"({re.escape(k)})" for k in self.alternatives) + ")", re.IGNORECASE
+        ) if self.alternatives else None
 
-    for clause_type, keywords in RISK_PATTERNS.items():
-        for keyword in keywords:
-            if keyword in clause_lower:
-                detected.append(clause_type)
-                break
+    def scan(self, clause: str) -> dict:
+        """
+        Scans a clause once and returns its clause types, the matched
+        keyword spans as (start, end, clause_type) and its risk level.
+        """
+        matches = []
+        found = set()
+
+        if self.regex is not None and clause:
+            lowered = clause.lower()
+            if len(lowered) == len(clause):
+                found_keywords = ((m.start(), m.group(1)) for m in self.regex.finditer(lowered))
+            else:
+                found_keywords = (
+                    (m.start(), self.alternatives[m.lastindex - 1])
+                    for m in self.regex_ignorecase.finditer(clause)
+                )
+
+            for start, keyword in found_keywords:
+                for clause_type, length in self.implied[keyword]:
+                    matches.append((start, start + length, clause_type))
+                    found.add(clause_type)
+
+        clause_types = sorted(found, key=self.type_order.__getitem__)
+        return {
+            "types": clause_types,
+            "matches": matches,
+            "risk": risk_from_types(clause_types)
+        }
+
+
+# id(table) -> (table, matcher); the table is kept so its id stays unique
+_matchers = {}
+
+
+def _table_signature(patterns: dict) -> tuple:
+    return tuple((clause_type, tuple(keywords)) for clause_type, keywords in patterns.items())
+
+
+def get_matcher(patterns: dict = None) -> ClauseMatcher:
+    """
+    Returns the compiled matcher for a pattern table (RISK_PATTERNS by
+    default), rebuilt if the table was edited since it was compiled.
+    """
+    if patterns is None:
+        patterns = RISK_PATTERNS
 
-    return detected
+    signature = _table_signature(patterns)
+    cached = _matchers.get(id(patterns))
+    if cached is None or cached[1].signature != signature:
+        cached = _matchers[id(patterns)] = (patterns, ClauseMatcher(patterns, signature))
+
+    return cached[1]
+
+
+def refresh_rules():
+    """
+    Drops compiled matchers and merged language tables to free them;
+    edited tables are picked up without it.
+    """
+    _matchers.clear()
+    _language_tables.clear()
+
+
+_language_tables = {}
+
+
+def patterns_for_language(language: str = None) -> dict:
+    """
+    Pattern table for clauses in a language: RISK_PATTERNS plus that
+    language's keywords. The merged table is built once per language and
+    rebuilt when either source table changes.
+    """
+    extra = LANGUAGE_RISK_PATTERNS.get(language)
+    if not extra:
+        return RISK_PATTERNS
+
+    sources = (_table_signature(RISK_PATTERNS), _table_signature(extra))
+    cached = _language_tables.get(language)
+    if cached is None or cached[0] != sources:
+        merged = {clause_type: list(keywords) for clause_type, keywords in RISK_PATTERNS.items()}
+        for clause_type, keywords in extra.items():
+            merged.setdefault(clause_type, []).extend(keywords)
+        if cached is not None:
+            _matchers.pop(id(cached[1]), None)
+        cached = _language_tables[language] = (sources, merged)
+
+    return cached[1]
+
+
+def rules_version(patterns: dict = None) -> str:
+    """
+    Short fingerprint of a pattern table (all rule tables by default),
+    used to key cached analyses.
+    """
+    if patterns is None:
+        signature = (
+            _table_signature(RISK_PATTERNS),
+            tuple((lang, _table_signature(table)) for lang, table in sorted(LANGUAGE_RISK_PATTERNS.items()))
+        )
+    else:
+        signature = _table_signature(patterns)
+    return hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()[:12]
+
+
+def clause_scanner():
+    """
+    Returns scan(clause, language=None), scan_clause for many clauses:
+    each language's rules are looked up (and checked for edits) on first
+    use, then reused for every later clause.
+    """
+    matchers = {}
+
+    def scan(clause: str, language: str = None) -> dict:
+        matcher = matchers.get(language)
+        if matcher is None:
+            matcher = matchers[language] = get_matcher(patterns_for_language(language))
+        return matcher.scan(clause)
+
+    return scan
+
+
+def scan_clause(clause: str, patterns: dict = None, language: str = None) -> dict:
+    """
+    Single-pass rule scan of a clause, with the rules for its language
+    unless an explicit pattern table is given.
+    Returns {"types": [...], "matches": [(start, end, type), ...], "risk": level}.
+    """
+    if patterns is None:
+        patterns = patterns_for_language(language)
+    return get_matcher(patterns).scan(clause)
+
+
+# Detect which legal clause types are present
+
+def detect_clause_types(clause: str) -> list:
+    return scan_clause(clause)["types"]
 
 
 
 # Assign risk level to an individual clause
 
-def assess_risk_level(clause: str) -> str:
-    clause_types = detect_clause_types(clause)
-
-    # High-risk clause types for SMEs
-    high_risk_types = {
-        "Penalty Clause",
-        "Indemnity Clause",
-        "Unilateral Termination",
-        "Non-Compete",
-        "IP Transfer"
-    }
-
-    if any(ct in high_risk_types for ct in clause_types):
+def risk_from_types(clause_types: list) -> str:
+    if any(ct in HIGH_RISK_TYPES for ct in clause_types):
         return "High"
 
     if clause_types:
@@ -75,10 +288,18 @@ def assess_risk_level(clause: str) -> str:
     return "Low"
 
 
+def assess_risk_level(clause: str) -> str:
+    return scan_clause(clause)["risk"]
+
+
 
 # Compute overall contract risk
 # Uses legal override logic (not just averages)
 
+# Clause weights for the average-based fallback
+RISK_SCORES = {"Low": 1, "Medium": 2, "High": 3}
+
+
 def contract_risk_score(risk_levels: list) -> str:
     """
     Legal logic:
@@ -87,7 +308,19 @@ def contract_risk_score(risk_levels: list) -> str:
     - Otherwise fallback to weighted average
     """
 
-    high_count = risk_levels.count("High")
+    return contract_risk_score_from_counts(
+        {level: risk_levels.count(level) for level in RISK_SCORES}
+    )
+
+
+def contract_risk_score_from_counts(counts: dict) -> str:
+    """
+    contract_risk_score from per-level clause counts, e.g.
+    {"High": 1, "Medium": 4, "Low": 20}, so it can be kept up to date
+    incrementally. A contract without clauses is "Not Scored".
+    """
+
+    high_count = counts.get("High", 0)
 
     if high_count >= 2:
         return "High Risk"
@@ -96,8 +329,11 @@ def contract_risk_score(risk_levels: list) -> str:
         return "Medium Risk"
 
     # Fallback average-based scoring
-    score_map = {"Low": 1, "Medium": 2, "High": 3}
-    avg_score = sum(score_map[r] for r in risk_levels) / len(risk_levels)
+    total = sum(counts.get(level, 0) for level in RISK_SCORES)
+    if not total:
+        return "Not Scored"
+
+    avg_score = sum(RISK_SCORES[level] * counts.get(level, 0) for level in RISK_SCORES) / total
 
     if avg_score >= 2.3:
         return "High Risk"
@@ -0,0 +1,364 @@
+# service.py
+
+# Local analysis service for other internal tools
+# Plain asyncio HTTP on localhost, no third-party dependencies (air-gapped use)
+#
+# Usage:
+#   python service.py --port 8765 --workers 4 --queue-size 32
+#
+#   POST /jobs?filename=contract.pdf   body: raw document bytes  -> 202 {"job_id": ...}
+#   GET  /jobs/<id>                    job status
+#   GET  /jobs/<id>/events             status updates as JSON lines until the job ends
+#   GET  /jobs/<id>/result             analysis result (409 until the job is done)
+#   GET  /health                       liveness and capacity
+#   GET  /metrics                      Prometheus text format
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qs
+
+from batch_analyze import SUPPORTED_EXTENSIONS, analyze_bytes, init_worker
+
+
+STATUS_TEXT = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+    429: "Too Many Requests", 500: "Internal Server Error"
+}
+
+TERMINAL_STATES = ("done", "failed")
+
+
+class Job:
+    __slots__ = ("id", "filename", "status", "submitted", "started", "finished",
+                 "error", "result", "data", "changed")
+
+    def __init__(self, filename: str, data: bytes):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.result = None
+        self.data = data
+        self.changed = asyncio.Event()
+
+    def update(self, status: str, **fields):
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+        # Wake everyone streaming this job, then arm a fresh event
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def status_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error
+        }
+
+
+class AnalysisService:
+    """
+    Bounded job queue in front of a process pool with warm spaCy models.
+    Submissions beyond queue_size are rejected with 429 instead of piling up.
+    A pool broken by a dying worker is replaced; /health reports "degraded"
+    until the new workers are up.
+    """
+
+    def __init__(self, workers=None, concurrency=None, queue_size=32,
+                 max_body_bytes=100 * 1024 * 1024, keep_finished=1000, clause_languages=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency or self.workers
+        self.queue_size = queue_size
+        self.max_body_bytes = max_body_bytes
+        self.keep_finished = keep_finished
+        self.clause_languages = clause_languages
+
+        self.jobs = OrderedDict()
+        self.metrics = {
+            "jobs_submitted_total": 0,
+            "jobs_rejected_total": 0,
+            "jobs_completed_total": 0,
+            "jobs_failed_total": 0,
+            "job_seconds_sum": 0.0,
+            "pool_restarts_total": 0
+        }
+        self.running = 0
+        self.started = time.time()
+
+        self._queue = None
+        self._pool = None
+        self._warming = None
+        self._consumers = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._pool = self._new_pool()
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        tasks = self._consumers + ([self._warming] if self._warming else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+    def _replace_pool(self, broken: ProcessPoolExecutor):
+        """
+        Swaps in a fresh pool for one whose worker died (crash, OOM kill).
+        Every job in flight on the broken pool fails; only the first one
+        to notice replaces it.
+        """
+        if self._pool is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._new_pool()
+        self.metrics["pool_restarts_total"] += 1
+        self._warming = asyncio.create_task(self._warm_pool(self._pool))
+
+    async def _warm_pool(self, pool: ProcessPoolExecutor):
+        # Starts the workers (and their spaCy models) before declaring the pool healthy
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(self.workers)))
+        except BrokenProcessPool:
+            pass
+        finally:
+            if self._pool is pool:
+                self._warming = None
+
+    # Jobs
+
+    def submit(self, filename: str, data: bytes) -> Job:
+        """
+        Queues a document; returns the job, or None when the queue is full.
+        """
+        job = Job(filename, data)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.metrics["jobs_rejected_total"] += 1
+            return None
+
+        self.jobs[job.id] = job
+        self.metrics["jobs_submitted_total"] += 1
+        self._forget_old_jobs()
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in TERMINAL_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            self.running += 1
+            job.update("running", started=time.time())
+            pool = self._pool
+            try:
+                result = await loop.run_in_executor(
+                    pool, analyze_bytes, job.data, job.filename,
+                    False, True, self.clause_languages
+                )
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._replace_pool(pool)
+                self.metrics["jobs_failed_total"] += 1
+                job.update("failed", finished=time.time(), error=f"{type(e).__name__}: {e}", data=None)
+            else:
+                self.metrics["jobs_completed_total"] += 1
+                job.update("done", finished=time.time(), result=result, data=None)
+            finally:
+                self.running -= 1
+                self.metrics["job_seconds_sum"] += time.time() - job.started
+                self._queue.task_done()
+
+    # HTTP
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", "0"))
+            if length > self.max_body_bytes:
+                await self._send(writer, 413, {"error": "document too large"})
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            url = urlsplit(target)
+            await self._route(writer, method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), headers, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            await self._send(writer, 400, {"error": "malformed request"})
+        except ConnectionError:
+            pass
+        except Exception as e:
+            await self._send(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            writer.close()
+
+    async def _route(self, writer, method, path, query, headers, body):
+        parts = path.strip("/").split("/")
+
+        if path == "/health" and method == "GET":
+            await self._send(writer, 200, {
+                "status": "degraded" if self._warming else "ok",
+                "workers": self.workers,
+                "concurrency": self.concurrency,
+                "queued": self._queue.qsize(),
+                "queue_size": self.queue_size,
+                "running": self.running,
+                "pool_restarts": self.metrics["pool_restarts_total"],
+                "uptime_seconds": round(time.time() - self.started, 1)
+            })
+        elif path == "/metrics" and method == "GET":
+            await self._send(writer, 200, self._metrics_text(), "text/plain; version=0.0.4")
+        elif path == "/jobs":
+            if method != "POST":
+                await self._send(writer, 405, {"error": "use POST to submit a document"})
+                return
+            await self._submit(writer, query, headers, body)
+        elif parts[0] == "jobs" and len(parts) in (2, 3) and method == "GET":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                await self._send(writer, 404, {"error": "unknown job"})
+            elif len(parts) == 2:
+                await self._send(writer, 200, job.status_dict())
+            elif parts[2] == "result":
+                if job.status == "done":
+                    await self._send(writer, 200, {**job.status_dict(), "result": job.result})
+                else:
+                    await self._send(writer, 409, job.status_dict())
+            elif parts[2] == "events":
+                await self._stream_events(writer, job)
+            else:
+                await self._send(writer, 404, {"error": "not found"})
+        else:
+            await self._send(writer, 404, {"error": "not found"})
+
+    async def _submit(self, writer, query, headers, body):
+        filename = (query.get("filename") or [headers.get("x-filename", "")])[0]
+        if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            await self._send(writer, 400, {"error": "filename must end in .pdf, .docx or .txt"})
+            return
+        if not body:
+            await self._send(writer, 400, {"error": "empty document"})
+            return
+
+        job = self.submit(os.path.basename(filename), body)
+        if job is None:
+            await self._send(writer, 429, {"error": "queue full, retry later"}, extra_headers={"Retry-After": "5"})
+            return
+        await self._send(writer, 202, job.status_dict(), extra_headers={"Location": f"/jobs/{job.id}"})
+
+    async def _stream_events(self, writer, job):
+        # One JSON line per status change; the response ends with the job
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        while True:
+            changed = job.changed
+            writer.write((json.dumps(job.status_dict()) + "\n").encode("utf-8"))
+            await writer.drain()
+            if job.status in TERMINAL_STATES:
+                return
+            await changed.wait()
+
+    def _metrics_text(self) -> str:
+        values = dict(self.metrics)
+        values["jobs_queued"] = self._queue.qsize()
+        values["jobs_running"] = self.running
+        values["queue_capacity"] = self.queue_size
+        values["pool_degraded"] = int(self._warming is not None)
+        return "".join(
+            f"contract_analysis_{name} {round(value, 3) if isinstance(value, float) else value}\n"
+            for name, value in values.items()
+        )
+
+    async def _send(self, writer, status, payload, content_type="application/json", extra_headers=None):
+        body = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        body = body.encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            "Connection: close"
+        ]
+        for name, value in (extra_headers or {}).items():
+            head.append(f"{name}: {value}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def serve(host="127.0.0.1", port=8765, **options):
+    service = AnalysisService(**options)
+    await service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"analysis service listening on http://{host}:{port}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local contract analysis service.")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Jobs analyzed at once (default: workers)")
+    parser.add_argument("--queue-size", type=int, default=32, help="Queued jobs before new ones are rejected")
+    parser.add_argument("--max-body-mb", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(
+            args.host,
+            args.port,
+            workers=args.workers,
+            concurrency=args.concurrency,
+            queue_size=args.queue_size,
+            max_body_bytes=args.max_body_mb * 1024 * 1024
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
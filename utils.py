@@ -1,24 +1,326 @@
-from docx import Document
-from PyPDF2 import PdfReader
-from langdetect import detect
+import codecs
+import io
+import mmap
+import os
+import re
+import multiprocessing
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from xml.etree.ElementTree import iterparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this many pages a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 40
+
+# Pages handed to a worker per task
+PARALLEL_PAGES_PER_TASK = 16
+
+# Page ranges queued per worker; finished ranges wait for the consumer,
+# so this bounds how much extracted text is held ahead of it
+PARALLEL_TASKS_PER_WORKER = 2
+
+# Worker side: the PDF being extracted, as (path, reader)
+_worker_reader = None
+
+# Parent side: one pool shared by every document, its size, and the
+# number of documents using each pool (a resized pool's predecessor is
+# shut down once its last document is done)
+_pdf_pool = None
+_pdf_pool_workers = 0
+_pdf_pool_users = {}
+_pdf_pool_lock = threading.Lock()
+
+
+def _extract_page_range(path, start, stop):
+    # Workers keep the last PDF open, so the ranges of one document parse it once
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != path:
+        from PyPDF2 import PdfReader
+
+        _worker_reader = (path, PdfReader(path))
+    reader = _worker_reader[1]
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _acquire_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    # Created on first use; replaced when a worker died or another size is asked for
+    global _pdf_pool, _pdf_pool_workers
+    with _pdf_pool_lock:
+        if _pdf_pool is None or getattr(_pdf_pool, "_broken", False) or _pdf_pool_workers != workers:
+            old = _pdf_pool
+            # spawn: forking a threaded server process (Streamlit) is unsafe
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pdf_pool_workers = workers
+            if old is not None and old not in _pdf_pool_users:
+                old.shutdown(wait=False, cancel_futures=True)
+
+        _pdf_pool_users[_pdf_pool] = _pdf_pool_users.get(_pdf_pool, 0) + 1
+        return _pdf_pool
+
+
+def _release_pdf_pool(pool: ProcessPoolExecutor):
+    with _pdf_pool_lock:
+        _pdf_pool_users[pool] -= 1
+        if not _pdf_pool_users[pool]:
+            del _pdf_pool_users[pool]
+            if pool is not _pdf_pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_pages_parallel(data: bytes, workers: int, min_pages=PARALLEL_MIN_PAGES):
+    """
+    Extracts PDF page texts across a process pool and yields them in page order.
+    Falls back to serial extraction for small documents or a single worker.
+
+    Only workers * PARALLEL_TASKS_PER_WORKER page ranges are in flight at
+    a time, so a slow consumer holds a bounded amount of page text. The
+    pool is shared across documents; a call with another workers value
+    replaces it, and the old pool stops once its documents are done.
+    """
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+
+    if workers <= 1 or page_count < min_pages:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    del reader
+    ranges = iter([
+        (start, min(start + PARALLEL_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PARALLEL_PAGES_PER_TASK)
+    ])
+
+    # Workers read the PDF from a temporary file instead of receiving its bytes
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="pdf_extract_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        pool = _acquire_pdf_pool(workers)
+        in_flight = deque()
+
+        def submit_next():
+            page_range = next(ranges, None)
+            if page_range is not None:
+                in_flight.append(pool.submit(_extract_page_range, path, *page_range))
+
+        try:
+            for _ in range(workers * PARALLEL_TASKS_PER_WORKER):
+                submit_next()
+
+            while in_flight:
+                texts = in_flight.popleft().result()
+                submit_next()
+                yield from texts
+        finally:
+            for future in in_flight:
+                future.cancel()
+            _release_pdf_pool(pool)
+    finally:
+        os.remove(path)
+
+
+# DOCX and TXT text is yielded in chunks of about this many characters.
+# Chunks are cut at a space and joined back with one, so any consumer that
+# joins chunks with " " (extract_text, iter_clauses) sees the exact text
+TEXT_CHUNK_CHARS = 1024 * 1024
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Run content that python-docx renders into paragraph text
+_DOCX_RUN_TEXT = {_W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+
+
+def iter_docx_paragraphs(file):
+    """
+    Streams paragraph texts of a .docx in document order, table cells
+    included, by parsing word/document.xml incrementally. Text boxes are
+    skipped, as in python-docx.
+    """
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml:
+        body = None
+        depth = 0
+        body_depth = None
+        skip_depth = None
+        parts = []
+
+        for event, elem in iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if elem.tag == _W + "body":
+                    body, body_depth = elem, depth
+                elif elem.tag == _W + "txbxContent" and skip_depth is None:
+                    skip_depth = depth
+                continue
+
+            if skip_depth is None:
+                if elem.tag == _W + "t":
+                    parts.append(elem.text or "")
+                elif elem.tag in _DOCX_RUN_TEXT:
+                    parts.append(_DOCX_RUN_TEXT[elem.tag])
+                elif elem.tag == _W + "p":
+                    yield "".join(parts)
+                    parts = []
+            elif depth == skip_depth:
+                skip_depth = None
+
+            # Drop finished top-level blocks so memory stays flat
+            if body is not None and depth == body_depth + 1:
+                del body[:]
+            depth -= 1
+
+
+def _chunk_joined(texts, chunk_chars=TEXT_CHUNK_CHARS):
+    # Groups texts into chunks that, joined with " ", equal " ".join(texts)
+    batch = []
+    size = 0
+    for text in texts:
+        batch.append(text)
+        size += len(text) + 1
+        if size >= chunk_chars:
+            yield " ".join(batch)
+            batch = []
+            size = 0
+    if batch:
+        yield " ".join(batch)
+
+
+def iter_txt_chunks(file, chunk_chars=TEXT_CHUNK_CHARS):
+    """
+    Decodes a UTF-8 text file incrementally. Files on disk are
+    memory-mapped and in-memory uploads are read through their buffer,
+    so the raw bytes are never copied whole.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    try:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        # No real file (uploads) or an empty one, which mmap refuses
+        mapped = None
+
+    if mapped is not None:
+        view = memoryview(mapped)
+    elif hasattr(file, "getbuffer"):
+        view = file.getbuffer()
+    else:
+        view = memoryview(file.read())
+
+    try:
+        pending = ""
+        for pos in range(0, len(view), chunk_chars):
+            pending += decoder.decode(view[pos:pos + chunk_chars])
+            cut = pending.rfind(" ")
+            if cut >= 0:
+                yield pending[:cut]
+                pending = pending[cut + 1:]
+        yield pending + decoder.decode(b"", final=True)
+    finally:
+        view.release()
+        if mapped is not None:
+            mapped.close()
+
+
+def iter_page_texts(file, workers=None):
+    """
+    Yields document text one page at a time, so large documents never need
+    to be held as a single string. DOCX and TXT come out in chunks of about
+    TEXT_CHUNK_CHARS; all chunks are meant to be joined with " ".
+    workers > 1 extracts PDF pages in parallel processes.
+    """
+    name = file.name.lower()
+
+    if name.endswith(".pdf"):
+        if workers and workers > 1:
+            yield from iter_pdf_pages_parallel(file.read(), workers)
+            return
+
+        from PyPDF2 import PdfReader
 
-def extract_text(file):
-    if file.name.endswith(".pdf"):
         reader = PdfReader(file)
-        return " ".join([page.extract_text() or "" for page in reader.pages])
+        for page in reader.pages:
+            yield page.extract_text() or ""
 
-    elif file.name.endswith(".docx"):
-        doc = Document(file)
-        return " ".join([p.text for p in doc.paragraphs])
+    elif name.endswith(".docx"):
+        yield from _chunk_joined(iter_docx_paragraphs(file))
 
-    elif file.name.endswith(".txt"):
-        return file.read().decode("utf-8")
+    elif name.endswith(".txt"):
+        yield from iter_txt_chunks(file)
 
     else:
         raise ValueError("Unsupported file format")
 
-def detect_language(text):
+def extract_text(file, workers=None):
+    return " ".join(iter_page_texts(file, workers))
+
+# Language detection reads this many evenly spaced windows of the text,
+# so its cost does not grow with document length
+LANGUAGE_SAMPLE_WINDOWS = 8
+LANGUAGE_WINDOW_CHARS = 600
+
+# Fixed seed: langdetect is randomized and otherwise not repeatable
+LANGUAGE_SEED = 0
+
+_DEVANAGARI_RE = re.compile(r"[\u0900-\u097F]")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+
+
+def sample_text(text, windows=LANGUAGE_SAMPLE_WINDOWS, window_chars=LANGUAGE_WINDOW_CHARS):
+    """
+    Joins evenly spaced windows of text; short texts are returned whole.
+    """
+    if len(text) <= windows * window_chars:
+        return text
+
+    step = (len(text) - window_chars) / (windows - 1) if windows > 1 else 0
+    return " ".join(
+        text[int(i * step):int(i * step) + window_chars] for i in range(windows)
+    )
+
+
+def detect_language_with_confidence(text, windows=LANGUAGE_SAMPLE_WINDOWS, window_chars=LANGUAGE_WINDOW_CHARS):
+    """
+    Detects the language of a bounded sample of text.
+    Returns (language code, probability); ("en", 0.0) when undetectable.
+    """
+    from langdetect import DetectorFactory, detect_langs
+    from langdetect.lang_detect_exception import LangDetectException
+
+    DetectorFactory.seed = LANGUAGE_SEED
+
     try:
-        return detect(text)
-    except:
-        return "en"
+        best = detect_langs(sample_text(text, windows, window_chars))[0]
+    except LangDetectException:
+        return "en", 0.0
+
+    return best.lang, round(best.prob, 3)
+
+
+def detect_language(text):
+    return detect_language_with_confidence(text)[0]
+
+
+def tag_clause_languages(texts, default="en") -> list:
+    """
+    Tags each clause "hi" or "en" by script, for mixed English/Hindi
+    contracts. Clauses with no letters of either script get default.
+    """
+    tags = []
+    for text in texts:
+        devanagari = len(_DEVANAGARI_RE.findall(text))
+        latin = len(_LATIN_RE.findall(text))
+        if devanagari > latin:
+            tags.append("hi")
+        elif latin:
+            tags.append("en")
+        else:
+            tags.append(default)
+    return tags